@@ -0,0 +1,55 @@
+"""
+One-off backfill for PlatformComponentVersionIndex
+
+Rows registered before check_for_updates moved to the GSI lack the
+platform_component/version_numeric keys, so the index never sees them.
+This fills both in (and rewrites stale sort keys) for every row; rows that
+are already current are left untouched, so it is safe to run repeatedly.
+
+Usage: UPDATES_TABLE=<table> python backfill_version_index.py
+"""
+from typing import Dict, Any
+
+from index import UPDATES_TABLE, dynamodb, version_to_numeric
+
+def backfill_item(item: Dict[str, Any]) -> bool:
+    """
+    Write the index keys for one raw DynamoDB item; returns True if it was updated
+    """
+    platform_component = f"{item['platform']['S']}#{item['component']['S']}"
+    version_numeric = str(version_to_numeric(item['version']['S']))
+    if (item.get('platform_component', {}).get('S') == platform_component
+            and item.get('version_numeric', {}).get('N') == version_numeric):
+        return False
+
+    dynamodb.update_item(
+        TableName=UPDATES_TABLE,
+        Key={'id': item['id']},
+        UpdateExpression='SET platform_component = :pc, version_numeric = :vn',
+        ConditionExpression='attribute_exists(id)',
+        ExpressionAttributeValues={
+            ':pc': {'S': platform_component},
+            ':vn': {'N': version_numeric}
+        }
+    )
+    return True
+
+def main() -> None:
+    updated = current = unindexable = 0
+    for page in dynamodb.get_paginator('scan').paginate(TableName=UPDATES_TABLE):
+        for item in page.get('Items', []):
+            try:
+                if backfill_item(item):
+                    updated += 1
+                else:
+                    current += 1
+            except (KeyError, ValueError) as e:
+                # Missing fields or a version the sort key cannot represent; such
+                # rows stay out of the index and must be re-registered by hand
+                print(f"Cannot index {item.get('id', {}).get('S')}: {e!r}")
+                unindexable += 1
+
+    print(f"{UPDATES_TABLE}: {updated} updated, {current} already current, {unindexable} not indexable")
+
+if __name__ == '__main__':
+    main()
@@ -1,33 +1,73 @@
-import json
 import boto3
+import orjson
 import os
+import re
+import time
+from boto3.dynamodb.types import TypeSerializer, TypeDeserializer
+from botocore.config import Config
 from datetime import datetime, timezone
-from typing import Dict, Any, List, Optional
+from decimal import Decimal
+from functools import lru_cache
+from typing import Dict, Any, List, Tuple
 
-# Initialize AWS services
-dynamodb = boto3.resource('dynamodb')
+# Initialize AWS services (keep connections alive across warm invocations)
+boto_config = Config(tcp_keepalive=True, retries={'max_attempts': 3, 'mode': 'adaptive'})
+
+dynamodb = boto3.client('dynamodb', config=boto_config)
 s3 = boto3.client('s3')
 
+serializer = TypeSerializer()
+deserializer = TypeDeserializer()
+
 # Environment variables
 UPDATES_TABLE = os.environ.get('UPDATES_TABLE', 'mahaa-app-updates')
 UPDATES_BUCKET = os.environ.get('UPDATES_BUCKET', 'mahaatailors-frontend-dev')
 
+# GSI keyed on "platform#component" with the numeric version as sort key
+VERSION_INDEX = 'PlatformComponentVersionIndex'
+
+# Attributes check_for_updates returns; every name is aliased since several
+# (e.g. "size") are DynamoDB reserved words
+UPDATE_INFO_FIELDS = ('version', 'component', 'description', 'size', 'critical',
+                      'download_url', 'checksum', 'release_date', 'dependencies')
+UPDATE_INFO_PROJECTION = ', '.join(f'#{field}' for field in UPDATE_INFO_FIELDS)
+UPDATE_INFO_NAMES = {f'#{field}': field for field in UPDATE_INFO_FIELDS}
+
+# BatchWriteItem accepts at most 25 put requests per call
+BATCH_WRITE_LIMIT = 25
+BATCH_WRITE_RETRIES = 5
+
+REQUIRED_VERSION_FIELDS = frozenset({'version', 'platform', 'component'})
+
+# Presigned download URLs are valid for 1 hour and reused by a warm container
+# until fewer than 5 minutes remain
+PRESIGN_EXPIRES_IN = 3600
+PRESIGN_REUSE_MARGIN = 300
+PRESIGN_CACHE_MAX = 256
+# Insertion order is expiry order: every URL gets the same lifetime and a key is
+# only re-signed after its stale entry has been dropped
+_presigned_urls: Dict[str, Tuple[str, float]] = {}
+
+# Versions carry up to four dotted parts, each below 10**6 so it fits its own
+# slot in the numeric sort key
+VERSION_PARTS = 4
+VERSION_PART_LIMIT = 10**6
+
+# Fallback for versions the plain split/int parse rejects (e.g. "1.2.0-beta.1")
+_VERSION_RE = re.compile(r'(\d+(?:\.\d+){0,3})(?:-[\w.]+)?')
+
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Handle app update requests
     """
     try:
-        http_method = event.get('httpMethod', '')
-        path = event.get('path', '')
-        
-        if http_method == 'GET' and '/check-updates' in path:
-            return check_for_updates(event)
-        elif http_method == 'GET' and '/download-update' in path:
-            return download_update(event)
-        elif http_method == 'POST' and '/register-version' in path:
-            return register_version(event)
-        else:
+        route = event.get('resource') or event.get('path')
+        method = event.get('httpMethod', '')
+        
+        handler = ROUTES.get((method, route))
+        if handler is None:
             return create_response(404, {'error': 'Endpoint not found'})
+        return handler(event)
             
     except Exception as e:
         print(f"Error: {str(e)}")
@@ -43,36 +83,48 @@ def check_for_updates(event: Dict[str, Any]) -> Dict[str, Any]:
         platform = query_params.get('platform', 'android')
         component = query_params.get('component', 'all')
         
-        table = dynamodb.Table(UPDATES_TABLE)
+        try:
+            current_numeric = version_to_numeric(current_version)
+        except ValueError:
+            # Installed clients may report versions the sort key cannot hold;
+            # answer them with "no updates" rather than failing their check
+            print(f"Warning: unparseable current version {current_version!r}, reporting no updates")
+            return create_response(200, {
+                'has_updates': False,
+                'current_version': current_version,
+                'updates': []
+            })
         
-        # Get latest version info
-        response = table.scan(
-            FilterExpression='platform = :platform AND component = :component',
+        # Every version newer than the client's, newest first, compared on the sort
+        # key; intermediate releases are kept so a critical one is never skipped
+        pages = dynamodb.get_paginator('query').paginate(
+            TableName=UPDATES_TABLE,
+            IndexName=VERSION_INDEX,
+            KeyConditionExpression='platform_component = :pc AND version_numeric > :current',
+            ProjectionExpression=UPDATE_INFO_PROJECTION,
+            ExpressionAttributeNames=UPDATE_INFO_NAMES,
             ExpressionAttributeValues={
-                ':platform': platform,
-                ':component': component
-            }
+                ':pc': {'S': f"{platform}#{component}"},
+                ':current': {'N': str(current_numeric)}
+            },
+            ScanIndexForward=False
         )
         
         updates_available = []
         
-        for item in response['Items']:
-            if is_version_newer(item['version'], current_version):
-                update_info = {
-                    'version': item['version'],
-                    'component': item['component'],
-                    'description': item.get('description', ''),
-                    'size': item.get('size', 0),
-                    'critical': item.get('critical', False),
-                    'download_url': item.get('download_url', ''),
-                    'checksum': item.get('checksum', ''),
-                    'release_date': item.get('release_date', ''),
-                    'dependencies': item.get('dependencies', [])
-                }
-                updates_available.append(update_info)
-        
-        # Sort by version (newest first)
-        updates_available.sort(key=lambda x: x['version'], reverse=True)
+        for item in (deserialize_item(raw) for page in pages for raw in page.get('Items', [])):
+            update_info = {
+                'version': item['version'],
+                'component': item['component'],
+                'description': item.get('description', ''),
+                'size': item.get('size', 0),
+                'critical': item.get('critical', False),
+                'download_url': item.get('download_url', ''),
+                'checksum': item.get('checksum', ''),
+                'release_date': item.get('release_date', ''),
+                'dependencies': item.get('dependencies', [])
+            }
+            updates_available.append(update_info)
         
         return create_response(200, {
             'has_updates': len(updates_available) > 0,
@@ -100,83 +152,184 @@ def download_update(event: Dict[str, Any]) -> Dict[str, Any]:
         # Generate S3 key (using mobile/ prefix for consistency with frontend bucket)
         s3_key = f"mobile/updates/{platform}/{component}/{version}/update.zip"
         
-        # Generate presigned URL (valid for 1 hour)
-        presigned_url = s3.generate_presigned_url(
-            'get_object',
-            Params={'Bucket': UPDATES_BUCKET, 'Key': s3_key},
-            ExpiresIn=3600
-        )
+        # Reuse this container's signed URL while it still has a useful lifetime left
+        now = time.time()
+        cached = _presigned_urls.get(s3_key)
+        if cached and cached[1] - now > PRESIGN_REUSE_MARGIN:
+            presigned_url, expires_at = cached
+        else:
+            presigned_url = s3.generate_presigned_url(
+                'get_object',
+                Params={'Bucket': UPDATES_BUCKET, 'Key': s3_key},
+                ExpiresIn=PRESIGN_EXPIRES_IN
+            )
+            expires_at = now + PRESIGN_EXPIRES_IN
+            prune_presigned_urls(now)
+            # Re-insert at the end so the cache stays ordered by expiry
+            _presigned_urls.pop(s3_key, None)
+            _presigned_urls[s3_key] = (presigned_url, expires_at)
         
         return create_response(200, {
             'download_url': presigned_url,
-            'expires_in': 3600
+            'expires_in': int(expires_at - now)
         })
         
     except Exception as e:
         print(f"Error generating download URL: {str(e)}")
         return create_response(500, {'error': 'Failed to generate download URL'})
 
+def prune_presigned_urls(now: float) -> None:
+    """
+    Drop cached URLs past their reuse window, oldest first, and keep room for one more
+    """
+    while _presigned_urls:
+        oldest_key = next(iter(_presigned_urls))
+        if _presigned_urls[oldest_key][1] - now > PRESIGN_REUSE_MARGIN and len(_presigned_urls) < PRESIGN_CACHE_MAX:
+            break
+        del _presigned_urls[oldest_key]
+
 def register_version(event: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Register a new version (admin endpoint)
+    Register a new version, or a list of versions in one request (admin endpoint)
     """
     try:
-        body = json.loads(event.get('body', '{}'))
-        
-        required_fields = ['version', 'platform', 'component']
-        for field in required_fields:
-            if field not in body:
-                return create_response(400, {'error': f'Missing required field: {field}'})
-        
-        table = dynamodb.Table(UPDATES_TABLE)
-        
-        item = {
-            'id': f"{body['platform']}#{body['component']}#{body['version']}",
-            'version': body['version'],
-            'platform': body['platform'],
-            'component': body['component'],
-            'description': body.get('description', ''),
-            'size': body.get('size', 0),
-            'critical': body.get('critical', False),
-            'download_url': body.get('download_url', ''),
-            'checksum': body.get('checksum', ''),
-            'dependencies': body.get('dependencies', []),
-            'release_date': datetime.now(timezone.utc).isoformat(),
-            'created_at': datetime.now(timezone.utc).isoformat()
-        }
-        
-        table.put_item(Item=item)
-        
-        return create_response(201, {'message': 'Version registered successfully'})
+        body = orjson.loads(event.get('body') or '{}')
+        entries = body if isinstance(body, list) else [body]
+        if not entries:
+            return create_response(400, {'error': 'No versions to register'})
+        
+        # One timestamp for the whole request, shared by every item in a batch
+        now_iso = datetime.now(timezone.utc).isoformat()
+        items = {}
+        for index, entry in enumerate(entries):
+            if not isinstance(entry, dict):
+                return create_response(400, {'error': f'Version entry {index} must be an object'})
+            try:
+                item = build_version_item(entry, now_iso)
+            except ValueError as e:
+                return create_response(400, {'error': str(e)})
+            # Later entries win so a batch never carries the same key twice
+            items[item['id']] = item
+        
+        if len(items) == 1:
+            dynamodb.put_item(TableName=UPDATES_TABLE, Item=serialize_item(next(iter(items.values()))))
+        else:
+            batch_put_items(list(items.values()))
+        
+        message = 'Version registered successfully' if len(items) == 1 else f'{len(items)} versions registered successfully'
+        return create_response(201, {'message': message})
         
     except Exception as e:
         print(f"Error registering version: {str(e)}")
         return create_response(500, {'error': 'Failed to register version'})
 
-def is_version_newer(version1: str, version2: str) -> bool:
+def build_version_item(body: Dict[str, Any], now_iso: str) -> Dict[str, Any]:
     """
-    Compare two version strings (semantic versioning)
-    Returns True if version1 is newer than version2
+    Validate a version registration payload and build its table item
     """
+    missing = REQUIRED_VERSION_FIELDS - body.keys()
+    if missing:
+        raise ValueError(f"Missing required fields: {', '.join(sorted(missing))}")
+    
     try:
-        v1_parts = [int(x) for x in version1.split('.')]
-        v2_parts = [int(x) for x in version2.split('.')]
-        
-        # Pad shorter version with zeros
-        max_len = max(len(v1_parts), len(v2_parts))
-        v1_parts.extend([0] * (max_len - len(v1_parts)))
-        v2_parts.extend([0] * (max_len - len(v2_parts)))
-        
-        for i in range(max_len):
-            if v1_parts[i] > v2_parts[i]:
-                return True
-            elif v1_parts[i] < v2_parts[i]:
-                return False
-        
-        return False
-        
-    except Exception:
-        return False
+        version_numeric = version_to_numeric(body['version'])
+    except (ValueError, TypeError, AttributeError):
+        # TypeError: unhashable values (lists, objects) never reach the parse cache;
+        # AttributeError: other non-strings (numbers, booleans) have no split
+        raise ValueError('Invalid version format: expected up to four numeric parts below 1000000, optionally followed by a -pre-release tag')
+    
+    return {
+        'id': f"{body['platform']}#{body['component']}#{body['version']}",
+        'version': body['version'],
+        'platform': body['platform'],
+        'component': body['component'],
+        'platform_component': f"{body['platform']}#{body['component']}",
+        'version_numeric': version_numeric,
+        'description': body.get('description', ''),
+        'size': body.get('size', 0),
+        'critical': body.get('critical', False),
+        'download_url': body.get('download_url', ''),
+        'checksum': body.get('checksum', ''),
+        'dependencies': body.get('dependencies', []),
+        'release_date': now_iso,
+        'created_at': now_iso
+    }
+
+def batch_put_items(items: List[Dict[str, Any]]) -> None:
+    """
+    Write items with BatchWriteItem, 25 per call, resending anything DynamoDB leaves unprocessed
+    """
+    for start in range(0, len(items), BATCH_WRITE_LIMIT):
+        requests = [{'PutRequest': {'Item': serialize_item(item)}} for item in items[start:start + BATCH_WRITE_LIMIT]]
+        pending = {UPDATES_TABLE: requests}
+        for attempt in range(BATCH_WRITE_RETRIES):
+            response = dynamodb.batch_write_item(RequestItems=pending)
+            pending = response.get('UnprocessedItems') or {}
+            if not pending:
+                break
+            time.sleep(0.05 * 2 ** attempt)
+        else:
+            raise RuntimeError(f'{len(pending[UPDATES_TABLE])} items left unprocessed after {BATCH_WRITE_RETRIES} attempts')
+
+def serialize_item(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert a plain dict into DynamoDB attribute-value format
+    """
+    return {key: serializer.serialize(value) for key, value in data.items()}
+
+def deserialize_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert a DynamoDB attribute-value map into a plain dict
+    """
+    return {key: deserializer.deserialize(value) for key, value in item.items()}
+
+@lru_cache(maxsize=1024)
+def parse_version(version: str) -> Tuple[Tuple[int, ...], bool]:
+    """
+    Parse a dotted version string into its numeric parts and a pre-release flag (cached per string)
+    """
+    try:
+        parts, prerelease = tuple(int(x) for x in version.split('.')), False
+    except ValueError:
+        # Only unusual inputs pay for the regex; the numeric core is kept and
+        # the pre-release tag only marks the version as preceding its release
+        match = _VERSION_RE.fullmatch(version)
+        if not match:
+            raise
+        parts, prerelease = tuple(int(x) for x in match.group(1).split('.')), True
+    if len(parts) > VERSION_PARTS or not all(0 <= part < VERSION_PART_LIMIT for part in parts):
+        raise ValueError(f'Version out of range: {version!r}')
+    return parts, prerelease
+
+def version_to_numeric(version: str) -> int:
+    """
+    Encode a version string as a sortable integer; a pre-release sorts just below
+    its release (pre-releases of the same core share one key)
+    """
+    parts, prerelease = parse_version(version)
+    numeric = 0
+    for part in (parts + (0,) * VERSION_PARTS)[:VERSION_PARTS]:
+        numeric = numeric * VERSION_PART_LIMIT + part
+    return numeric * 2 + (0 if prerelease else 1)
+
+def _json_default(obj: Any) -> Any:
+    """
+    Encode DynamoDB Decimals, which orjson does not handle natively
+    """
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+def _dumps(obj: Any) -> str:
+    return orjson.dumps(obj, default=_json_default).decode()
+
+# Identical on every response, so built once and shared
+RESPONSE_HEADERS = {
+    'Content-Type': 'application/json',
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type, Authorization'
+}
 
 def create_response(status_code: int, body: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -184,11 +337,13 @@ def create_response(status_code: int, body: Dict[str, Any]) -> Dict[str, Any]:
     """
     return {
         'statusCode': status_code,
-        'headers': {
-            'Content-Type': 'application/json',
-            'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
-            'Access-Control-Allow-Headers': 'Content-Type, Authorization'
-        },
-        'body': json.dumps(body)
-    }
\ No newline at end of file
+        'headers': RESPONSE_HEADERS,
+        'body': _dumps(body)
+    }
+
+# Dispatch on the route template API Gateway matched (event['resource'])
+ROUTES = {
+    ('GET', '/app-updates/check-updates'): check_for_updates,
+    ('GET', '/app-updates/download-update'): download_update,
+    ('POST', '/app-updates/register-version'): register_version,
+}
@@ -1,9 +1,14 @@
 import os
-import json
 import boto3
+import orjson
+from boto3.dynamodb.types import TypeSerializer, TypeDeserializer
+from botocore.config import Config
 from botocore.exceptions import ClientError
 import logging
-from datetime import datetime
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, InvalidOperation
 
 # Configure logging
 logger = logging.getLogger()
@@ -17,67 +22,158 @@ print(f"DEBUG: Using REGION: {REGION}")
 print(f"DEBUG: Using BILLS_TABLE_NAME: {BILLS_TABLE_NAME}")
 print(f"DEBUG: Using CUSTOMERS_TABLE_NAME: {CUSTOMERS_TABLE_NAME}")
 
-dynamodb = boto3.resource("dynamodb", region_name=REGION)
-bills_table = dynamodb.Table(BILLS_TABLE_NAME)
-customers_table = dynamodb.Table(CUSTOMERS_TABLE_NAME)
-
-def handle_error(e, function_name):
-    logger.error(f"Error in {function_name}: {e}")
+# Keep connections to DynamoDB alive across warm invocations, with a pool large
+# enough that concurrent calls from one container do not open fresh connections
+boto_config = Config(
+    max_pool_connections=50,
+    tcp_keepalive=True,
+    retries={"max_attempts": 3, "mode": "adaptive"},
+)
+
+dynamodb = boto3.client("dynamodb", region_name=REGION, config=boto_config)
+
+# Open the HTTPS connection during Lambda INIT so the first request doesn't pay for it
+try:
+    dynamodb.describe_table(TableName=BILLS_TABLE_NAME)
+except Exception as e:
+    logger.warning("DynamoDB warm-up failed: %s", e)
+
+serializer = TypeSerializer()
+deserializer = TypeDeserializer()
+
+def serialize_item(data):
+    return {key: serializer.serialize(value) for key, value in data.items()}
+
+def deserialize_item(item):
+    return {key: deserializer.deserialize(value) for key, value in item.items()}
+
+# DynamoDB numbers must be Decimal; floats go through repr() so 12.5 stays 12.5
+# instead of picking up binary rounding noise, and ints skip the string parse.
+# Anything that is not a finite number raises ValueError for a 400 response
+def _to_decimal(value):
+    if isinstance(value, bool):
+        raise ValueError(f"Not a number: {value!r}")
+    try:
+        if isinstance(value, Decimal):
+            result = value
+        elif isinstance(value, float):
+            result = Decimal(repr(value))
+        else:
+            result = Decimal(value)
+    except (InvalidOperation, TypeError, ValueError):
+        raise ValueError(f"Not a number: {value!r}")
+    if not result.is_finite():
+        raise ValueError(f"Not a number: {value!r}")
+    return result
+
+# Bill line items arrive as free-form JSON; the serializer rejects floats, so
+# convert them wherever they are nested
+def _decimalize(value):
+    if isinstance(value, float):
+        return _to_decimal(value)
+    if isinstance(value, dict):
+        return {key: _decimalize(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_decimalize(item) for item in value]
+    return value
+
+CORS_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "*",
+    "Access-Control-Allow-Headers": "*",
+}
+RESPONSE_HEADERS = {"Content-Type": "application/json", **CORS_HEADERS}
+
+def _json_default(obj):
+    # DynamoDB hands numbers back as Decimal, which orjson does not encode natively
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def _dumps(obj):
+    return orjson.dumps(obj, default=_json_default).decode()
+
+def create_response(status_code, body):
     return {
-        "statusCode": 500,
-        "body": json.dumps({"error": f"Error in {function_name}: {str(e)}"}),
-        "headers": {
-            "Content-Type": "application/json",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "*",
-            "Access-Control-Allow-Headers": "*",
-        },
+        "statusCode": status_code,
+        "body": _dumps(body),
+        "headers": RESPONSE_HEADERS,
     }
 
-def handle_options(event, context):
+def handle_error(e, function_name):
+    logger.error("Error in %s: %s", function_name, e)
+    return create_response(500, {"error": f"Error in {function_name}: {str(e)}"})
+
+CUSTOMER_ID_INDEX = "CustomerIdIndex"
+
+# Number of segments (and worker threads) for a full-table parallel scan
+SCAN_SEGMENTS = 4
+
+# Only the attributes get_bills returns; status and items are reserved words
+BILL_PROJECTION = "bill_id, customer_id, bill_date, total_amount, #s, #i, created_at, updated_at"
+
+def _format_bill(item):
     return {
-        "statusCode": 204,
-        "headers": {
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "*",
-            "Access-Control-Allow-Headers": "*",
-        },
+        "billId": item["bill_id"],
+        "customerId": item["customer_id"],
+        "billDate": item["bill_date"],
+        "totalAmount": item["total_amount"],
+        "status": item["status"],
+        "items": item.get("items", []),
+        "createdAt": item.get("created_at"),
+        "updatedAt": item.get("updated_at"),
     }
 
+# Scan every segment of a table concurrently and return the raw items
+def parallel_scan(table_name, **scan_kwargs):
+    def scan_segment(segment):
+        # A single Scan call stops at 1 MB; page through the whole segment
+        pages = dynamodb.get_paginator("scan").paginate(
+            TableName=table_name,
+            Segment=segment,
+            TotalSegments=SCAN_SEGMENTS,
+            **scan_kwargs,
+        )
+        return [item for page in pages for item in page.get("Items", [])]
+
+    with ThreadPoolExecutor(max_workers=SCAN_SEGMENTS) as executor:
+        return [item for segment in executor.map(scan_segment, range(SCAN_SEGMENTS)) for item in segment]
+
 def get_bills(event, context):
     try:
-        response = bills_table.scan()
-        bills = [
-            {
-                "billId": item["bill_id"],
-                "customerId": item["customer_id"],
-                "billDate": item["bill_date"],
-                "totalAmount": item["total_amount"],
-                "status": item["status"],
-                "items": item.get("items", []),
-                "createdAt": item.get("created_at"),
-                "updatedAt": item.get("updated_at"),
-            }
-            for item in response.get("Items", [])
-        ]
-
-        logger.info(f"Fetched bills: {bills}")
-        return {
-            "statusCode": 200,
-            "body": json.dumps(bills),
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "*",
-                "Access-Control-Allow-Headers": "*",
-            },
+        query_params = event.get("queryStringParameters") or {}
+        customer_id = query_params.get("customerId")
+        projection = {
+            "ProjectionExpression": BILL_PROJECTION,
+            "ExpressionAttributeNames": {"#s": "status", "#i": "items"},
         }
+
+        if customer_id:
+            # Read only this customer's bills from the GSI instead of the whole table;
+            # a single Query call stops at 1 MB, so page through every result
+            pages = dynamodb.get_paginator("query").paginate(
+                TableName=BILLS_TABLE_NAME,
+                IndexName=CUSTOMER_ID_INDEX,
+                KeyConditionExpression="customer_id = :customerId",
+                ExpressionAttributeValues=serialize_item({":customerId": customer_id}),
+                **projection,
+            )
+            raw_items = [item for page in pages for item in page.get("Items", [])]
+        else:
+            raw_items = parallel_scan(BILLS_TABLE_NAME, **projection)
+
+        bills = list(map(_format_bill, map(deserialize_item, raw_items)))
+
+        logger.info("Fetched %d bills", len(bills))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Fetched bills: %s", bills)
+        return create_response(200, bills)
     except Exception as e:
         return handle_error(e, "get_bills")
 
 def add_bill(event, context):
     try:
-        body = json.loads(event.get("body", "{}"))
+        body = orjson.loads(event.get("body") or "{}")
         customer_id = body.get("customerId")
         bill_date = body.get("billDate")
         total_amount = body.get("totalAmount")
@@ -85,19 +181,16 @@ def add_bill(event, context):
         items = body.get("items", [])
 
         if not customer_id or not bill_date or total_amount is None or not status:
-            return {
-                "statusCode": 400,
-                "body": json.dumps({"error": "Customer ID, bill date, total amount, and status are required."}),
-                "headers": {
-                    "Content-Type": "application/json",
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "*",
-                    "Access-Control-Allow-Headers": "*",
-                },
-            }
-
-        bill_id = f"bill-{int(os.urandom(4).hex(), 16)}"
-        now = boto3.dynamodb.types.Decimal(str(int(os.urandom(4).hex(), 16)))
+            return create_response(400, {"error": "Customer ID, bill date, total amount, and status are required."})
+
+        try:
+            total_amount = _to_decimal(total_amount)
+        except ValueError:
+            return create_response(400, {"error": "Total amount must be a number."})
+        items = _decimalize(items)
+
+        bill_id = f"bill-{uuid.uuid4().hex}"
+        now = int(time.time())
 
         item = {
             "bill_id": bill_id,
@@ -110,32 +203,32 @@ def add_bill(event, context):
             "updated_at": now,
         }
 
-        bills_table.put_item(Item=item)
-
-        logger.info(f"Added bill: {item}")
-        return {
-            "statusCode": 200,
-            "body": json.dumps({
-                "billId": bill_id,
-                "customerId": customer_id,
-                "billDate": bill_date,
-                "totalAmount": total_amount,
-                "status": status,
-                "items": items,
-            }),
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "*",
-                "Access-Control-Allow-Headers": "*",
-            },
-        }
+        dynamodb.put_item(
+            TableName=BILLS_TABLE_NAME,
+            Item=serialize_item(item),
+            ConditionExpression="attribute_not_exists(bill_id)",
+        )
+
+        logger.info("Added bill: %s", bill_id)
+        logger.debug("Added bill item: %s", item)
+        return create_response(200, {
+            "billId": bill_id,
+            "customerId": customer_id,
+            "billDate": bill_date,
+            "totalAmount": total_amount,
+            "status": status,
+            "items": items,
+        })
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            return create_response(409, {"error": "Bill already exists."})
+        return handle_error(e, "add_bill")
     except Exception as e:
         return handle_error(e, "add_bill")
 
 def update_bill(event, context):
     try:
-        body = json.loads(event.get("body", "{}"))
+        body = orjson.loads(event.get("body") or "{}")
         bill_id = event["pathParameters"]["id"]
         customer_id = body.get("customerId")
         bill_date = body.get("billDate")
@@ -144,21 +237,18 @@ def update_bill(event, context):
         items = body.get("items", [])
 
         if not bill_id or not customer_id or not bill_date or total_amount is None or not status:
-            return {
-                "statusCode": 400,
-                "body": json.dumps({"error": "Bill ID, customer ID, bill date, total amount, and status are required for update."}),
-                "headers": {
-                    "Content-Type": "application/json",
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "*",
-                    "Access-Control-Allow-Headers": "*",
-                },
-            }
-
-        now = boto3.dynamodb.types.Decimal(str(int(os.urandom(4).hex(), 16)))
-
-        update_expression = "SET customer_id = :customerId, bill_date = :billDate, total_amount = :totalAmount, #s = :status, items = :items, updated_at = :updatedAt"
-        expression_attribute_names = {"#s": "status"}
+            return create_response(400, {"error": "Bill ID, customer ID, bill date, total amount, and status are required for update."})
+
+        try:
+            total_amount = _to_decimal(total_amount)
+        except ValueError:
+            return create_response(400, {"error": "Total amount must be a number."})
+        items = _decimalize(items)
+
+        now = int(time.time())
+
+        update_expression = "SET customer_id = :customerId, bill_date = :billDate, total_amount = :totalAmount, #s = :status, #i = :items, updated_at = :updatedAt"
+        expression_attribute_names = {"#s": "status", "#i": "items"}
         expression_attribute_values = {
             ":customerId": customer_id,
             ":billDate": bill_date,
@@ -168,45 +258,30 @@ def update_bill(event, context):
             ":updatedAt": now,
         }
 
-        response = bills_table.update_item(
-            Key={"bill_id": bill_id},
+        # Everything the response needs is already in hand; don't ask DynamoDB to echo it back
+        dynamodb.update_item(
+            TableName=BILLS_TABLE_NAME,
+            Key=serialize_item({"bill_id": bill_id}),
             UpdateExpression=update_expression,
             ExpressionAttributeNames=expression_attribute_names,
-            ExpressionAttributeValues=expression_attribute_values,
-            ReturnValues="ALL_NEW",
+            ExpressionAttributeValues=serialize_item(expression_attribute_values),
+            # Fail instead of upserting when the bill does not exist
+            ConditionExpression="attribute_exists(bill_id)",
+            ReturnValues="NONE",
         )
 
-        updated_item = response.get("Attributes")
-        logger.info(f"Updated bill: {updated_item}")
-        return {
-            "statusCode": 200,
-            "body": json.dumps({
-                "billId": updated_item["bill_id"],
-                "customerId": updated_item["customer_id"],
-                "billDate": updated_item["bill_date"],
-                "totalAmount": updated_item["total_amount"],
-                "status": updated_item["status"],
-                "items": updated_item.get("items"),
-            }),
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "*",
-                "Access-Control-Allow-Headers": "*",
-            },
-        }
+        logger.info("Updated bill: %s", bill_id)
+        return create_response(200, {
+            "billId": bill_id,
+            "customerId": customer_id,
+            "billDate": bill_date,
+            "totalAmount": total_amount,
+            "status": status,
+            "items": items,
+        })
     except ClientError as e:
-        if e.response["Error"]["Code"] == "ValidationException" and "The provided key element does not match the schema" in str(e):
-            return {
-                "statusCode": 404,
-                "body": json.dumps({"error": "Bill not found."}),
-                "headers": {
-                    "Content-Type": "application/json",
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "*",
-                    "Access-Control-Allow-Headers": "*",
-                },
-            }
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            return create_response(404, {"error": "Bill not found."})
         return handle_error(e, "update_bill")
     except Exception as e:
         return handle_error(e, "update_bill")
@@ -215,30 +290,20 @@ def delete_bill(event, context):
     try:
         bill_id = event["pathParameters"]["id"]
         if not bill_id:
-            return {
-                "statusCode": 400,
-                "body": json.dumps({"error": "Bill ID is required for deletion."}),
-                "headers": {
-                    "Content-Type": "application/json",
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "*",
-                    "Access-Control-Allow-Headers": "*",
-                },
-            }
-
-        bills_table.delete_item(Key={"bill_id": bill_id})
-
-        logger.info(f"Deleted bill with ID: {bill_id}")
-        return {
-            "statusCode": 200,
-            "body": json.dumps("Bill deleted successfully!"),
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "*",
-                "Access-Control-Allow-Headers": "*",
-            },
-        }
+            return create_response(400, {"error": "Bill ID is required for deletion."})
+
+        dynamodb.delete_item(
+            TableName=BILLS_TABLE_NAME,
+            Key=serialize_item({"bill_id": bill_id}),
+            ConditionExpression="attribute_exists(bill_id)",
+        )
+
+        logger.info("Deleted bill with ID: %s", bill_id)
+        return create_response(200, "Bill deleted successfully!")
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            return create_response(404, {"error": "Bill not found."})
+        return handle_error(e, "delete_bill")
     except Exception as e:
         return handle_error(e, "delete_bill")
 
@@ -246,112 +311,78 @@ def get_customer_measurements(event, context):
     try:
         customer_id = event["pathParameters"]["id"]
         if not customer_id:
-            return {
-                "statusCode": 400,
-                "body": json.dumps({"error": "Customer ID is required."}),
-                "headers": {
-                    "Content-Type": "application/json",
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "*",
-                    "Access-Control-Allow-Headers": "*",
-                },
-            }
-
-        response = customers_table.get_item(Key={"customer_id": customer_id})
-        customer = response.get("Item")
+            return create_response(400, {"error": "Customer ID is required."})
+
+        response = dynamodb.get_item(TableName=CUSTOMERS_TABLE_NAME, Key=serialize_item({"customer_id": customer_id}))
+        customer = deserialize_item(response["Item"]) if "Item" in response else None
 
         if not customer:
-            return {
-                "statusCode": 404,
-                "body": json.dumps({"error": "Customer not found."}),
-                "headers": {
-                    "Content-Type": "application/json",
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "*",
-                    "Access-Control-Allow-Headers": "*",
-                },
-            }
+            return create_response(404, {"error": "Customer not found."})
 
         measurements = customer.get("measurements", {})
 
-        logger.info(f"Fetched measurements for customer {customer_id}: {measurements}")
-        return {
-            "statusCode": 200,
-            "body": json.dumps(measurements),
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "*",
-                "Access-Control-Allow-Headers": "*",
-            },
-        }
+        logger.info("Fetched %d measurements for customer %s", len(measurements), customer_id)
+        logger.debug("Fetched measurements for customer %s: %s", customer_id, measurements)
+        return create_response(200, measurements)
     except Exception as e:
         return handle_error(e, "get_customer_measurements")
 
 def save_customer_measurement(event, context):
     try:
         customer_id = event["pathParameters"]["id"]
-        body = json.loads(event.get("body", "{}"))
+        body = orjson.loads(event.get("body") or "{}")
         garment_type = body.get("garmentType")
         measurements = body.get("measurements")
 
         if not customer_id or not garment_type or not measurements:
-            return {
-                "statusCode": 400,
-                "body": json.dumps({"error": "Customer ID, garment type, and measurements are required."}),
-                "headers": {
-                    "Content-Type": "application/json",
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "*",
-                    "Access-Control-Allow-Headers": "*",
-                },
-            }
-
-        now = boto3.dynamodb.types.Decimal(str(int(os.urandom(4).hex(), 16)))
-
-        # Get existing customer to update measurements
-        response = customers_table.get_item(Key={"customer_id": customer_id})
-        customer = response.get("Item")
-
-        if not customer:
-            return {
-                "statusCode": 404,
-                "body": json.dumps({"error": "Customer not found."}),
-                "headers": {
-                    "Content-Type": "application/json",
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "*",
-                    "Access-Control-Allow-Headers": "*",
-                },
-            }
-
-        customer_measurements = customer.get("measurements", {})
-        customer_measurements[garment_type] = measurements
-
-        update_expression = "SET measurements = :measurements, updated_at = :updatedAt"
-        expression_attribute_values = {
-            ":measurements": customer_measurements,
-            ":updatedAt": now,
-        }
-
-        customers_table.update_item(
-            Key={"customer_id": customer_id},
-            UpdateExpression=update_expression,
-            ExpressionAttributeValues=expression_attribute_values,
-            ReturnValues="ALL_NEW",
-        )
-
-        logger.info(f"Saved measurements for customer {customer_id}, garment type {garment_type}")
-        return {
-            "statusCode": 200,
-            "body": json.dumps({"message": "Measurements saved successfully!"}),
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "*",
-                "Access-Control-Allow-Headers": "*",
-            },
+            return create_response(400, {"error": "Customer ID, garment type, and measurements are required."})
+
+        now = int(time.time())
+        key = serialize_item({"customer_id": customer_id})
+
+        # Set just this garment's entry in place, no read needed
+        set_garment = {
+            "TableName": CUSTOMERS_TABLE_NAME,
+            "Key": key,
+            "UpdateExpression": "SET measurements.#garmentType = :measurements, updated_at = :updatedAt",
+            "ConditionExpression": "attribute_exists(customer_id)",
+            "ExpressionAttributeNames": {"#garmentType": garment_type},
+            "ExpressionAttributeValues": serialize_item({":measurements": measurements, ":updatedAt": now}),
         }
+        try:
+            dynamodb.update_item(**set_garment)
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ValidationException":
+                raise
+            # The nested path is invalid, most likely because there is no measurements
+            # map yet; create it, and on failure inspect the old item to see why
+            try:
+                dynamodb.update_item(
+                    TableName=CUSTOMERS_TABLE_NAME,
+                    Key=key,
+                    UpdateExpression="SET measurements = :measurements, updated_at = :updatedAt",
+                    ConditionExpression="attribute_exists(customer_id) AND attribute_not_exists(measurements)",
+                    ExpressionAttributeValues=serialize_item({":measurements": {garment_type: measurements}, ":updatedAt": now}),
+                    ReturnValuesOnConditionCheckFailure="ALL_OLD",
+                )
+            except ClientError as e:
+                if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                    raise
+                old_item = e.response.get("Item")
+                if old_item is None:
+                    return create_response(404, {"error": "Customer not found."})
+                if "M" not in old_item.get("measurements", {}):
+                    # customer-management keeps a list under the same attribute
+                    return create_response(409, {"error": "Customer measurements are not stored as a garment map."})
+                # Another request created the map first, so the nested path is valid now
+                dynamodb.update_item(**set_garment)
+
+        logger.info("Saved measurements for customer %s, garment type %s", customer_id, garment_type)
+        return create_response(200, {"message": "Measurements saved successfully!"})
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            return create_response(404, {"error": "Customer not found."})
+        return handle_error(e, "save_customer_measurement")
     except Exception as e:
         return handle_error(e, "save_customer_measurement")
 
@@ -361,112 +392,57 @@ def delete_customer_measurement(event, context):
         measurement_id = event["pathParameters"]["measurementId"]
 
         if not customer_id or not measurement_id:
-            return {
-                "statusCode": 400,
-                "body": json.dumps({"error": "Customer ID and Measurement ID are required for deletion."}),
-                "headers": {
-                    "Content-Type": "application/json",
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "*",
-                    "Access-Control-Allow-Headers": "*",
-                },
-            }
-
-        response = customers_table.get_item(Key={"customer_id": customer_id})
-        customer = response.get("Item")
-
-        if not customer:
-            return {
-                "statusCode": 404,
-                "body": json.dumps({"error": "Customer not found."}),
-                "headers": {
-                    "Content-Type": "application/json",
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "*",
-                    "Access-Control-Allow-Headers": "*",
-                },
-            }
-
-        customer_measurements = customer.get("measurements", {})
-        if measurement_id in customer_measurements:
-            del customer_measurements[measurement_id]
-        else:
-            return {
-                "statusCode": 404,
-                "body": json.dumps({"error": "Measurement not found for this customer."}),
-                "headers": {
-                    "Content-Type": "application/json",
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "*",
-                    "Access-Control-Allow-Headers": "*",
-                },
-            }
-
-        now = boto3.dynamodb.types.Decimal(str(int(os.urandom(4).hex(), 16)))
-
-        update_expression = "SET measurements = :measurements, updated_at = :updatedAt"
-        expression_attribute_values = {
-            ":measurements": customer_measurements,
-            ":updatedAt": now,
-        }
-
-        customers_table.update_item(
-            Key={"customer_id": customer_id},
-            UpdateExpression=update_expression,
-            ExpressionAttributeValues=expression_attribute_values,
-            ReturnValues="ALL_NEW",
+            return create_response(400, {"error": "Customer ID and Measurement ID are required for deletion."})
+
+        now = int(time.time())
+
+        # Remove the entry in place; on failure DynamoDB returns the old item (if any)
+        # so a missing customer can be told apart from a missing measurement
+        dynamodb.update_item(
+            TableName=CUSTOMERS_TABLE_NAME,
+            Key=serialize_item({"customer_id": customer_id}),
+            UpdateExpression="REMOVE measurements.#measurementId SET updated_at = :updatedAt",
+            ConditionExpression="attribute_exists(measurements.#measurementId)",
+            ExpressionAttributeNames={"#measurementId": measurement_id},
+            ExpressionAttributeValues=serialize_item({":updatedAt": now}),
+            ReturnValuesOnConditionCheckFailure="ALL_OLD",
         )
 
-        logger.info(f"Deleted measurement {measurement_id} for customer {customer_id}")
-        return {
-            "statusCode": 200,
-            "body": json.dumps({"message": "Measurement deleted successfully!"}),
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "*",
-                "Access-Control-Allow-Headers": "*",
-            },
-        }
+        logger.info("Deleted measurement %s for customer %s", measurement_id, customer_id)
+        return create_response(200, {"message": "Measurement deleted successfully!"})
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            if "Item" in e.response:
+                return create_response(404, {"error": "Measurement not found for this customer."})
+            return create_response(404, {"error": "Customer not found."})
+        return handle_error(e, "delete_customer_measurement")
     except Exception as e:
         return handle_error(e, "delete_customer_measurement")
 
+# API Gateway passes the matched route template in event["resource"], so
+# dispatch is a single dict lookup on (method, template)
+ROUTES = {
+    ("GET", "/bills"): get_bills,
+    ("POST", "/bills"): add_bill,
+    ("PUT", "/bills/{id}"): update_bill,
+    ("DELETE", "/bills/{id}"): delete_bill,
+    ("GET", "/customers/{id}/measurements"): get_customer_measurements,
+    ("POST", "/customers/{id}/measurements"): save_customer_measurement,
+    ("DELETE", "/customers/{id}/measurements/{measurementId}"): delete_customer_measurement,
+}
+
 def lambda_handler(event, context):
-    logger.info(f"Received event: {json.dumps(event)}")
     http_method = event.get("httpMethod")
-    path = event.get("path")
-
-    if path == "/bills":
-        if http_method == "GET":
-            return get_bills(event, context)
-        elif http_method == "POST":
-            return add_bill(event, context)
-        elif http_method == "OPTIONS":
-            return handle_options(event, context)
-    elif path.startswith("/bills/"):
-        if http_method == "PUT":
-            return update_bill(event, context)
-        elif http_method == "DELETE":
-            return delete_bill(event, context)
-        elif http_method == "OPTIONS":
-            return handle_options(event, context)
-    elif path.startswith("/customers/") and "/measurements" in path:
-        if http_method == "GET" and path.endswith("/measurements"):
-            return get_customer_measurements(event, context)
-        elif http_method == "POST" and path.endswith("/measurements"):
-            return save_customer_measurement(event, context)
-        elif http_method == "DELETE" and "/measurements/" in path and path.count('/') == 4: # /customers/{id}/measurements/{measurementId}
-            return delete_customer_measurement(event, context)
-        elif http_method == "OPTIONS":
-            return handle_options(event, context)
-
-    return {
-        "statusCode": 404,
-        "body": json.dumps({"error": "Not Found"}),
-        "headers": {
-            "Content-Type": "application/json",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "*",
-            "Access-Control-Allow-Headers": "*",
-        },
-    }
+    resource = event.get("resource") or event.get("path")
+    logger.info(
+        "Received %s %s (request %s)",
+        http_method,
+        event.get("path"),
+        event.get("requestContext", {}).get("requestId"),
+    )
+
+    handler = ROUTES.get((http_method, resource))
+    if handler:
+        return handler(event, context)
+
+    return create_response(404, {"error": "Not Found"})
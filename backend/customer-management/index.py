@@ -1,17 +1,25 @@
 import os
-import json
 import boto3
+import orjson
+from botocore.config import Config
 from botocore.exceptions import ClientError
 import logging
+import secrets
 from boto3.dynamodb.conditions import Attr
-from datetime import datetime # Import datetime
+import time
+import uuid
+from functools import reduce
+from operator import or_
 from decimal import Decimal # Import Decimal
 
-class DecimalEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, Decimal):
-            return float(obj)
-        return json.JSONEncoder.default(self, obj)
+def _json_default(obj):
+    # DynamoDB hands numbers back as Decimal, which orjson does not encode natively
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def _dumps(obj):
+    return orjson.dumps(obj, default=_json_default).decode()
 
 # Configure logging
 logger = logging.getLogger()
@@ -27,33 +35,59 @@ print(f"DEBUG: Using CUSTOMERS_TABLE_NAME: {CUSTOMERS_TABLE_NAME}")
 print(f"DEBUG: Using MEASUREMENT_CONFIGS_TABLE_NAME: {MEASUREMENT_CONFIGS_TABLE_NAME}")
 print(f"DEBUG: Using BILLS_TABLE_NAME: {BILLS_TABLE_NAME}")
 
-dynamodb = boto3.resource("dynamodb", region_name=REGION)
+# Keep connections to DynamoDB alive across warm invocations
+boto_config = Config(tcp_keepalive=True, retries={"max_attempts": 3, "mode": "adaptive"})
+
+dynamodb = boto3.resource("dynamodb", region_name=REGION, config=boto_config)
 customers_table = dynamodb.Table(CUSTOMERS_TABLE_NAME)
 measurement_configs_table = dynamodb.Table(MEASUREMENT_CONFIGS_TABLE_NAME)
 bills_table = dynamodb.Table(BILLS_TABLE_NAME)
 
-def handle_error(e, function_name):
-    logger.error(f"Error in {function_name}: {e}")
+# Attributes returned to clients; skips the *_lower copies kept only for search
+CUSTOMER_PROJECTION = "customer_id, personalDetails, measurements, comments, customerNumber, created_at, updated_at"
+
+# Condition attributes are built once per container and reused by every search
+SEARCH_ATTRS = tuple(Attr(name) for name in (
+    "personalDetails.name",
+    "personalDetails.phone",
+    "personalDetails.address",
+    "personalDetails.email",
+    "customerNumber",
+))
+LOWER_SEARCH_ATTRS = tuple(Attr(name) for name in (
+    "personalDetails_lower.name",
+    "personalDetails_lower.phone",
+    "personalDetails_lower.address",
+    "personalDetails_lower.email",
+    "customerNumber_lower",
+))
+PERSONAL_DETAILS_LOWER_ATTR = Attr("personalDetails_lower")
+PHONE_ATTR = Attr("personalDetails.phone")
+
+# Upper bound on items read per Scan call while filling a filtered page
+MAX_SCAN_LIMIT = 1000
+
+# Conditional index-based measurement writes re-read the list once if it
+# shifted underneath
+MEASUREMENT_WRITE_ATTEMPTS = 2
+
+CORS_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "*",
+    "Access-Control-Allow-Headers": "*",
+}
+RESPONSE_HEADERS = {"Content-Type": "application/json", **CORS_HEADERS}
+
+def create_response(status_code, body):
     return {
-        "statusCode": 500,
-        "body": json.dumps({"error": f"Error in {function_name}: {str(e)}"}),
-        "headers": {
-            "Content-Type": "application/json",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "*",
-            "Access-Control-Allow-Headers": "*",
-        },
+        "statusCode": status_code,
+        "body": _dumps(body),
+        "headers": RESPONSE_HEADERS,
     }
 
-def handle_options(event, context):
-    return {
-        "statusCode": 204,
-        "headers": {
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "*",
-            "Access-Control-Allow-Headers": "*",
-        },
-    }
+def handle_error(e, function_name):
+    logger.error("Error in %s: %s", function_name, e)
+    return create_response(500, {"error": f"Error in {function_name}: {str(e)}"})
 
 def get_customers(event, context):
     try:
@@ -64,10 +98,11 @@ def get_customers(event, context):
         start_after = query_params.get("startAfter")
 
         scan_kwargs = {
-            "Limit": limit
+            "Limit": limit,
+            "ProjectionExpression": CUSTOMER_PROJECTION,
         }
 
-        logger.info(f"get_customers received search_text: {search_text}, search_field: {search_field}")
+        logger.debug("get_customers received search_text: %s, search_field: %s", search_text, search_field)
 
         if search_text and search_field == 'universal':
             # This is the corrected logic block
@@ -75,31 +110,19 @@ def get_customers(event, context):
 
             # Define filter for NEW records that have the _lower fields (case-insensitive)
             # This filter will only apply if 'personalDetails_lower' exists
-            new_data_filter = (
-                Attr("personalDetails_lower.name").contains(search_text_lower) |
-                Attr("personalDetails_lower.phone").contains(search_text_lower) |
-                Attr("personalDetails_lower.address").contains(search_text_lower) |
-                Attr("personalDetails_lower.email").contains(search_text_lower) |
-                Attr("customerNumber_lower").contains(search_text_lower)
-            )
+            new_data_filter = reduce(or_, (attr.contains(search_text_lower) for attr in LOWER_SEARCH_ATTRS))
 
             # Define filter for OLD records without _lower fields (case-sensitive)
             # This filter will only apply if 'personalDetails_lower' does NOT exist
-            old_data_filter = (
-                Attr("personalDetails.name").contains(search_text) |
-                Attr("personalDetails.phone").contains(search_text) |
-                Attr("personalDetails.address").contains(search_text) |
-                Attr("personalDetails.email").contains(search_text) |
-                Attr("customerNumber").contains(search_text)
-            )
+            old_data_filter = reduce(or_, (attr.contains(search_text) for attr in SEARCH_ATTRS))
 
             # Combine the filters:
             # - If personalDetails_lower exists, use the new_data_filter.
             # - If personalDetails_lower does not exist, use the old_data_filter.
             # The '&' is AND, '|' is OR.
             scan_kwargs["FilterExpression"] = (
-                (Attr('personalDetails_lower').exists() & new_data_filter) |
-                (Attr('personalDetails_lower').not_exists() & old_data_filter)
+                (PERSONAL_DETAILS_LOWER_ATTR.exists() & new_data_filter) |
+                (PERSONAL_DETAILS_LOWER_ATTR.not_exists() & old_data_filter)
             )
 
         elif search_text and search_field and search_field != 'universal':
@@ -109,42 +132,54 @@ def get_customers(event, context):
         if start_after and start_after.lower() not in ["null", "undefined"]:
             scan_kwargs["ExclusiveStartKey"] = {"customer_id": start_after}
 
-        logger.info(f"DynamoDB scan_kwargs: {scan_kwargs}")
+        logger.debug("DynamoDB scan_kwargs: %s", scan_kwargs)
         
         try:
-            response = customers_table.scan(**scan_kwargs)
-            logger.info(f"DynamoDB scan response count: {response.get('Count')}")
-            customers = [
-                {
-                    "id": item["customer_id"],
-                    "personalDetails": item.get("personalDetails", {}),
-                    "measurements": item.get("measurements", []),
-                    "comments": item.get("comments", ""),
-                    "customerNumber": item.get("customerNumber"),
-                    "createdAt": item.get("created_at"),
-                    "updatedAt": item.get("updated_at"),
-                }
-                for item in response.get("Items", [])
-            ]
+            # Limit caps the items DynamoDB reads before the filter runs, so a
+            # page can come back short (or empty) while more matches remain.
+            # Keep scanning until the page is full, growing the read window by
+            # the observed filter selectivity.
+            items = []
+            while True:
+                response = customers_table.scan(**scan_kwargs)
+                page_items = response.get("Items", [])
+                items.extend(page_items)
+                last_key = response.get("LastEvaluatedKey")
+                if len(items) >= limit or not last_key:
+                    break
+                remaining = limit - len(items)
+                scanned = response.get("ScannedCount") or scan_kwargs["Limit"]
+                scan_kwargs["Limit"] = min(MAX_SCAN_LIMIT, max(remaining, remaining * scanned // max(len(page_items), 1)))
+                scan_kwargs["ExclusiveStartKey"] = last_key
+            logger.debug("DynamoDB scan response count: %d", len(items))
         except ClientError as e:
-            logger.error(f"DynamoDB ClientError during scan: {e.response['Error']['Code']} - {e.response['Error']['Message']}")
+            logger.error("DynamoDB ClientError during scan: %s - %s", e.response['Error']['Code'], e.response['Error']['Message'])
             raise e
 
-        last_evaluated_key = response.get("LastEvaluatedKey", {}).get("customer_id")
-
-        return {
-            "statusCode": 200,
-            "body": json.dumps({
-                "customers": customers,
-                "lastEvaluatedKey": last_evaluated_key
-            }, cls=DecimalEncoder),
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "*",
-                "Access-Control-Allow-Headers": "*",
-            },
-        }
+        if len(items) > limit:
+            # Resume after the last customer actually returned
+            items = items[:limit]
+            last_evaluated_key = items[-1]["customer_id"]
+        else:
+            last_evaluated_key = last_key.get("customer_id") if last_key else None
+
+        customers = [
+            {
+                "id": item["customer_id"],
+                "personalDetails": item.get("personalDetails", {}),
+                "measurements": item.get("measurements", []),
+                "comments": item.get("comments", ""),
+                "customerNumber": item.get("customerNumber"),
+                "createdAt": item.get("created_at"),
+                "updatedAt": item.get("updated_at"),
+            }
+            for item in items
+        ]
+
+        return create_response(200, {
+            "customers": customers,
+            "lastEvaluatedKey": last_evaluated_key
+        })
     except Exception as e:
         return handle_error(e, "get_customers")
 
@@ -152,31 +187,13 @@ def get_customer_by_id(event, context):
     try:
         customer_id = event["pathParameters"]["id"]
         if not customer_id:
-            return {
-                "statusCode": 400,
-                "body": json.dumps({"error": "Customer ID is required."}),
-                "headers": {
-                    "Content-Type": "application/json",
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "*",
-                    "Access-Control-Allow-Headers": "*",
-                },
-            }
+            return create_response(400, {"error": "Customer ID is required."})
 
-        response = customers_table.get_item(Key={"customer_id": customer_id})
+        response = customers_table.get_item(Key={"customer_id": customer_id}, ProjectionExpression=CUSTOMER_PROJECTION)
         customer = response.get("Item")
         
         if not customer:
-            return {
-                "statusCode": 404,
-                "body": json.dumps({"error": "Customer not found."}),
-                "headers": {
-                    "Content-Type": "application/json",
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "*",
-                    "Access-Control-Allow-Headers": "*",
-                },
-            }
+            return create_response(404, {"error": "Customer not found."})
 
         customer_details = {
             "id": customer["customer_id"],
@@ -188,22 +205,13 @@ def get_customer_by_id(event, context):
             "updatedAt": customer.get("updated_at"),
         }
 
-        return {
-            "statusCode": 200,
-            "body": json.dumps(customer_details, cls=DecimalEncoder),
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "*",
-                "Access-Control-Allow-Headers": "*",
-            },
-        }
+        return create_response(200, customer_details)
     except Exception as e:
         return handle_error(e, "get_customer_by_id")
 
 def add_customer(event, context):
     try:
-        body = json.loads(event.get("body", "{}"))
+        body = orjson.loads(event.get("body") or "{}")
         personal_details = body.get("personalDetails", {})
         measurements = body.get("measurements", [])
         comments = body.get("comments", "")
@@ -212,23 +220,14 @@ def add_customer(event, context):
         phone = personal_details.get("phone")
 
         if not name or not phone:
-            return {
-                "statusCode": 400,
-                "body": json.dumps({"error": "Customer name and phone are required in personalDetails."}),
-                "headers": {
-                    "Content-Type": "application/json",
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "*",
-                    "Access-Control-Allow-Headers": "*",
-                },
-            }
+            return create_response(400, {"error": "Customer name and phone are required in personalDetails."})
 
         # Generate a unique customer_id
-        customer_id = f"cust-{os.urandom(16).hex()}"
+        customer_id = f"cust-{uuid.uuid4().hex}"
         # Generate a simple customerNumber from the customer_id for display purposes
         # In a real application, this might be a sequential number from a counter
         customer_number = customer_id[-8:] # Use last 8 characters of the UUID
-        now = int(datetime.now().timestamp()) # Use current timestamp
+        now = int(time.time())
 
         # Prepare lowercase fields for search
         personal_details_lower = {k: v.lower() if isinstance(v, str) else v for k, v in personal_details.items()}
@@ -246,31 +245,22 @@ def add_customer(event, context):
             "updated_at": now,
         }
 
-        logger.info(f"Attempting to put item into DynamoDB: {json.dumps(item, cls=DecimalEncoder)}")
+        logger.debug("Attempting to put item into DynamoDB: %s", item)
         customers_table.put_item(Item=item)
-        logger.info(f"Successfully added customer with ID: {customer_id}")
-
-        return {
-            "statusCode": 200,
-            "body": json.dumps({
-                "id": customer_id,
-                "personalDetails": personal_details,
-                "measurements": measurements,
-                "comments": comments,
-            }, cls=DecimalEncoder),
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "*",
-                "Access-Control-Allow-Headers": "*",
-            },
-        }
+        logger.info("Successfully added customer with ID: %s", customer_id)
+
+        return create_response(200, {
+            "id": customer_id,
+            "personalDetails": personal_details,
+            "measurements": measurements,
+            "comments": comments,
+        })
     except Exception as e:
         return handle_error(e, "add_customer")
 
 def update_customer(event, context):
     try:
-        body = json.loads(event.get("body", "{}"))
+        body = orjson.loads(event.get("body") or "{}")
         customer_id = event["pathParameters"]["id"]
         personal_details = body.get("personalDetails", {})
         measurements = body.get("measurements", [])
@@ -280,18 +270,9 @@ def update_customer(event, context):
         phone = personal_details.get("phone")
 
         if not customer_id or not name or not phone:
-            return {
-                "statusCode": 400,
-                "body": json.dumps({"error": "Customer ID, name, and phone are required for update."}),
-                "headers": {
-                    "Content-Type": "application/json",
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "*",
-                    "Access-Control-Allow-Headers": "*",
-                },
-            }
+            return create_response(400, {"error": "Customer ID, name, and phone are required for update."})
 
-        now = int(datetime.now().timestamp())
+        now = int(time.time())
 
         # Prepare lowercase fields for update
         personal_details_lower = {k: v.lower() if isinstance(v, str) else v for k, v in personal_details.items()}
@@ -307,42 +288,26 @@ def update_customer(event, context):
             ":updatedAt": now,
         }
 
-        response = customers_table.update_item(
+        # Everything the response needs is already in hand; don't ask DynamoDB to echo it back
+        customers_table.update_item(
             Key={"customer_id": customer_id},
             UpdateExpression=update_expression,
             ExpressionAttributeValues=expression_attribute_values,
-            ReturnValues="ALL_NEW",
+            # Fail instead of upserting when the customer does not exist
+            ConditionExpression="attribute_exists(customer_id)",
+            ReturnValues="NONE",
         )
 
-        updated_item = response.get("Attributes")
-        logger.info(f"Updated customer: {updated_item}")
-        return {
-            "statusCode": 200,
-            "body": json.dumps({
-                "id": updated_item["customer_id"],
-                "personalDetails": updated_item.get("personalDetails"),
-                "measurements": updated_item.get("measurements"),
-                "comments": updated_item.get("comments"),
-            }),
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "*",
-                "Access-Control-Allow-Headers": "*",
-            },
-        }
+        logger.info("Updated customer: %s", customer_id)
+        return create_response(200, {
+            "id": customer_id,
+            "personalDetails": personal_details,
+            "measurements": measurements,
+            "comments": comments,
+        })
     except ClientError as e:
-        if e.response["Error"]["Code"] == "ValidationException" and "The provided key element does not match the schema" in str(e):
-            return {
-                "statusCode": 404,
-                "body": json.dumps({"error": "Customer not found."}),
-                "headers": {
-                    "Content-Type": "application/json",
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "*",
-                    "Access-Control-Allow-Headers": "*",
-                },
-            }
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            return create_response(404, {"error": "Customer not found."})
         return handle_error(e, "update_customer")
     except Exception as e:
         return handle_error(e, "update_customer")
@@ -351,30 +316,19 @@ def delete_customer(event, context):
     try:
         customer_id = event["pathParameters"]["id"]
         if not customer_id:
-            return {
-                "statusCode": 400,
-                "body": json.dumps({"error": "Customer ID is required for deletion."}),
-                "headers": {
-                    "Content-Type": "application/json",
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "*",
-                    "Access-Control-Allow-Headers": "*",
-                },
-            }
+            return create_response(400, {"error": "Customer ID is required for deletion."})
 
-        customers_table.delete_item(Key={"customer_id": customer_id})
-
-        logger.info(f"Deleted customer with ID: {customer_id}")
-        return {
-            "statusCode": 200,
-            "body": json.dumps("Customer deleted successfully!"),
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "*",
-                "Access-Control-Allow-Headers": "*",
-            },
-        }
+        customers_table.delete_item(
+            Key={"customer_id": customer_id},
+            ConditionExpression="attribute_exists(customer_id)",
+        )
+
+        logger.info("Deleted customer with ID: %s", customer_id)
+        return create_response(200, "Customer deleted successfully!")
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            return create_response(404, {"error": "Customer not found."})
+        return handle_error(e, "delete_customer")
     except Exception as e:
         return handle_error(e, "delete_customer")
 
@@ -384,18 +338,9 @@ def check_customer_exists(event, context):
         phone = query_params.get("phone")
 
         if not phone:
-            return {
-                "statusCode": 400,
-                "body": json.dumps({"error": "Phone number is required for existence check."}),
-                "headers": {
-                    "Content-Type": "application/json",
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "*",
-                    "Access-Control-Allow-Headers": "*",
-                },
-            }
+            return create_response(400, {"error": "Phone number is required for existence check."})
 
-        filter_expression = Attr("personalDetails.phone").eq(phone)
+        filter_expression = PHONE_ATTR.eq(phone)
 
         scan_kwargs = {
             "FilterExpression": filter_expression
@@ -406,18 +351,8 @@ def check_customer_exists(event, context):
 
         phone_only_duplicates = []
 
+        # Decimals are left as-is; create_response converts them while serializing
         for customer in all_found_customers:
-            # Convert Decimal types to float for JSON serialization
-            if 'created_at' in customer:
-                customer['created_at'] = float(customer['created_at'])
-            if 'updated_at' in customer:
-                customer['updated_at'] = float(customer['updated_at'])
-            if 'personalDetails' in customer:
-                if isinstance(customer['personalDetails'], dict):
-                    for key, value in customer['personalDetails'].items():
-                        if isinstance(value, Decimal):
-                            customer['personalDetails'][key] = float(value)
-
             # Categorize duplicates
             customer_phone = customer.get("personalDetails", {}).get("phone")
 
@@ -426,23 +361,15 @@ def check_customer_exists(event, context):
 
         customer_exists = len(phone_only_duplicates) > 0
 
-        logger.info(f"Customer existence check with params {query_params}: exists={customer_exists}, "
-                    f"phone_only_duplicates={len(phone_only_duplicates)}")
-
-        return {
-            "statusCode": 200,
-            "body": json.dumps({
-                "exists": customer_exists,
-                "allCustomers": all_found_customers, # Still return all found customers for context if needed
-                "phoneOnlyDuplicates": phone_only_duplicates,
-            }, cls=DecimalEncoder),
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "*",
-                "Access-Control-Allow-Headers": "*",
-            },
-        }
+        logger.info("Customer existence check: exists=%s, phone_only_duplicates=%d",
+                    customer_exists, len(phone_only_duplicates))
+        logger.debug("Customer existence check params: %s", query_params)
+
+        return create_response(200, {
+            "exists": customer_exists,
+            "allCustomers": all_found_customers, # Still return all found customers for context if needed
+            "phoneOnlyDuplicates": phone_only_duplicates,
+        })
     except Exception as e:
         return handle_error(e, "check_customer_exists")
 
@@ -450,127 +377,111 @@ def get_customer_measurements(event, context):
     try:
         customer_id = event["pathParameters"]["id"]
         if not customer_id:
-            return {
-                "statusCode": 400,
-                "body": json.dumps({"error": "Customer ID is required."}),
-                "headers": {
-                    "Content-Type": "application/json",
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "*",
-                    "Access-Control-Allow-Headers": "*",
-                },
-            }
+            return create_response(400, {"error": "Customer ID is required."})
 
         # Get customer to retrieve measurements
-        response = customers_table.get_item(Key={"customer_id": customer_id})
+        response = customers_table.get_item(
+            Key={"customer_id": customer_id},
+            ProjectionExpression="customer_id, measurements",
+        )
         customer = response.get("Item")
         
         if not customer:
-            return {
-                "statusCode": 404,
-                "body": json.dumps({"error": "Customer not found."}),
-                "headers": {
-                    "Content-Type": "application/json",
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "*",
-                    "Access-Control-Allow-Headers": "*",
-                },
-            }
+            return create_response(404, {"error": "Customer not found."})
 
         measurements = customer.get("measurements", [])
         
-        return {
-            "statusCode": 200,
-            "body": json.dumps({"measurements": measurements}, cls=DecimalEncoder),
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "*",
-                "Access-Control-Allow-Headers": "*",
-            },
-        }
+        return create_response(200, {"measurements": measurements})
     except Exception as e:
         return handle_error(e, "get_customer_measurements")
 
 def save_customer_measurement(event, context):
     try:
         customer_id = event["pathParameters"]["id"]
-        body = json.loads(event.get("body", "{}"))
+        body = orjson.loads(event.get("body") or "{}")
         
         if not customer_id:
-            return {
-                "statusCode": 400,
-                "body": json.dumps({"error": "Customer ID is required."}),
-                "headers": {
-                    "Content-Type": "application/json",
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "*",
-                    "Access-Control-Allow-Headers": "*",
-                },
-            }
+            return create_response(400, {"error": "Customer ID is required."})
 
-        # Get current customer data
-        response = customers_table.get_item(Key={"customer_id": customer_id})
-        customer = response.get("Item")
-        
-        if not customer:
-            return {
-                "statusCode": 404,
-                "body": json.dumps({"error": "Customer not found."}),
-                "headers": {
-                    "Content-Type": "application/json",
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "*",
-                    "Access-Control-Allow-Headers": "*",
-                },
-            }
-
-        measurements = customer.get("measurements", [])
         measurement_id = body.get("id")
         
         # Create new measurement object
         new_measurement = {
-            "id": measurement_id or f"meas-{os.urandom(8).hex()}",
+            "id": measurement_id or f"meas-{secrets.token_hex(8)}",
             "garmentType": body.get("garmentType"),
             "fields": body.get("fields", []),
             "notes": body.get("notes", ""),
             "lastMeasuredDate": body.get("lastMeasuredDate"),
         }
+        now = int(time.time())
         
-        # Update or add measurement
-        if measurement_id:
-            # Update existing measurement
-            for i, meas in enumerate(measurements):
-                if meas.get("id") == measurement_id:
-                    measurements[i] = new_measurement
-                    break
-            else:
-                measurements.append(new_measurement)
+        if not measurement_id:
+            # Add new measurement: append server-side so the existing list is
+            # neither read nor rewritten
+            try:
+                customers_table.update_item(
+                    Key={"customer_id": customer_id},
+                    UpdateExpression="SET measurements = list_append(if_not_exists(measurements, :empty), :newMeasurement), updated_at = :updatedAt",
+                    ConditionExpression="attribute_exists(customer_id)",
+                    ExpressionAttributeValues={
+                        ":empty": [],
+                        ":newMeasurement": [new_measurement],
+                        ":updatedAt": now,
+                    }
+                )
+            except ClientError as e:
+                if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                    return create_response(404, {"error": "Customer not found."})
+                raise
+            return create_response(200, new_measurement)
+
+        # Replace the entry in place by index, guarded on the slot still holding
+        # this ID, rather than rewriting the whole list; an unknown ID is appended
+        for _ in range(MEASUREMENT_WRITE_ATTEMPTS):
+            response = customers_table.get_item(
+                Key={"customer_id": customer_id},
+                ProjectionExpression="measurements",
+            )
+            customer = response.get("Item")
+
+            if not customer:
+                return create_response(404, {"error": "Customer not found."})
+
+            index = next(
+                (i for i, meas in enumerate(customer.get("measurements", [])) if meas.get("id") == measurement_id),
+                None,
+            )
+            try:
+                if index is None:
+                    customers_table.update_item(
+                        Key={"customer_id": customer_id},
+                        UpdateExpression="SET measurements = list_append(if_not_exists(measurements, :empty), :newMeasurement), updated_at = :updatedAt",
+                        ConditionExpression="attribute_exists(customer_id)",
+                        ExpressionAttributeValues={
+                            ":empty": [],
+                            ":newMeasurement": [new_measurement],
+                            ":updatedAt": now,
+                        }
+                    )
+                else:
+                    customers_table.update_item(
+                        Key={"customer_id": customer_id},
+                        UpdateExpression=f"SET measurements[{index}] = :measurement, updated_at = :updatedAt",
+                        ConditionExpression=f"measurements[{index}].id = :measurementId",
+                        ExpressionAttributeValues={
+                            ":measurement": new_measurement,
+                            ":measurementId": measurement_id,
+                            ":updatedAt": now,
+                        }
+                    )
+                break
+            except ClientError as e:
+                if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                    raise
         else:
-            # Add new measurement
-            measurements.append(new_measurement)
-        
-        # Update customer with new measurements
-        now = int(datetime.now().timestamp())
-        customers_table.update_item(
-            Key={"customer_id": customer_id},
-            UpdateExpression="SET measurements = :measurements, updated_at = :updatedAt",
-            ExpressionAttributeValues={
-                ":measurements": measurements,
-                ":updatedAt": now,
-            }
-        )
+            return create_response(409, {"error": "Measurements changed concurrently, please retry."})
         
-        return {
-            "statusCode": 200,
-            "body": json.dumps(new_measurement, cls=DecimalEncoder),
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "*",
-                "Access-Control-Allow-Headers": "*",
-            },
-        }
+        return create_response(200, new_measurement)
     except Exception as e:
         return handle_error(e, "save_customer_measurement")
 
@@ -580,111 +491,75 @@ def delete_customer_measurement(event, context):
         measurement_id = event["pathParameters"]["measurementId"]
         
         if not customer_id or not measurement_id:
-            return {
-                "statusCode": 400,
-                "body": json.dumps({"error": "Customer ID and Measurement ID are required."}),
-                "headers": {
-                    "Content-Type": "application/json",
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "*",
-                    "Access-Control-Allow-Headers": "*",
-                },
-            }
+            return create_response(400, {"error": "Customer ID and Measurement ID are required."})
+
+        # Locate the entry, then remove it by index only if that slot still holds
+        # the same measurement; a concurrent edit that shifts the list fails the
+        # condition and the lookup is retried
+        for _ in range(MEASUREMENT_WRITE_ATTEMPTS):
+            response = customers_table.get_item(
+                Key={"customer_id": customer_id},
+                ProjectionExpression="measurements",
+            )
+            customer = response.get("Item")
 
-        # Get current customer data
-        response = customers_table.get_item(Key={"customer_id": customer_id})
-        customer = response.get("Item")
-        
-        if not customer:
-            return {
-                "statusCode": 404,
-                "body": json.dumps({"error": "Customer not found."}),
-                "headers": {
-                    "Content-Type": "application/json",
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "*",
-                    "Access-Control-Allow-Headers": "*",
-                },
-            }
+            if not customer:
+                return create_response(404, {"error": "Customer not found."})
 
-        measurements = customer.get("measurements", [])
-        
-        # Remove measurement with matching ID
-        measurements = [meas for meas in measurements if meas.get("id") != measurement_id]
-        
-        # Update customer with filtered measurements
-        now = int(datetime.now().timestamp())
-        customers_table.update_item(
-            Key={"customer_id": customer_id},
-            UpdateExpression="SET measurements = :measurements, updated_at = :updatedAt",
-            ExpressionAttributeValues={
-                ":measurements": measurements,
-                ":updatedAt": now,
-            }
-        )
+            index = next(
+                (i for i, meas in enumerate(customer.get("measurements", [])) if meas.get("id") == measurement_id),
+                None,
+            )
+            if index is None:
+                # Already gone; deleting is idempotent
+                break
+
+            now = int(time.time())
+            try:
+                customers_table.update_item(
+                    Key={"customer_id": customer_id},
+                    UpdateExpression=f"REMOVE measurements[{index}] SET updated_at = :updatedAt",
+                    ConditionExpression=f"measurements[{index}].id = :measurementId",
+                    ExpressionAttributeValues={
+                        ":measurementId": measurement_id,
+                        ":updatedAt": now,
+                    },
+                )
+                break
+            except ClientError as e:
+                if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                    raise
+        else:
+            return create_response(409, {"error": "Measurements changed concurrently, please retry."})
         
-        return {
-            "statusCode": 200,
-            "body": json.dumps({"message": "Measurement deleted successfully"}),
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "*",
-                "Access-Control-Allow-Headers": "*",
-            },
-        }
+        return create_response(200, {"message": "Measurement deleted successfully"})
     except Exception as e:
         return handle_error(e, "delete_customer_measurement")
 
+ROUTES = {
+    ("GET", "/customers"): get_customers,
+    ("POST", "/customers"): add_customer,
+    ("GET", "/customers/exists"): check_customer_exists,
+    ("GET", "/customers/{id}"): get_customer_by_id,
+    ("PUT", "/customers/{id}"): update_customer,
+    ("DELETE", "/customers/{id}"): delete_customer,
+    ("GET", "/customers/{id}/measurements"): get_customer_measurements,
+    ("POST", "/customers/{id}/measurements"): save_customer_measurement,
+    ("DELETE", "/customers/{id}/measurements/{measurementId}"): delete_customer_measurement,
+}
+
 def lambda_handler(event, context):
-    logger.info(f"Received event: {json.dumps(event)}")
     http_method = event.get("httpMethod")
-    path = event.get("path")
-    logger.info(f"DEBUG: Received path: {path}, httpMethod: {http_method}")
-
-    if path == "/customers":
-        if http_method == "GET":
-            return get_customers(event, context)
-        elif http_method == "POST":
-            return add_customer(event, context)
-        elif http_method == "OPTIONS":
-            return handle_options(event, context)
-    elif path.startswith("/customers/exists"): # Use startswith for more robust path matching
-        if http_method == "GET":
-            return check_customer_exists(event, context)
-        elif http_method == "OPTIONS":
-            return handle_options(event, context)
-    elif "/measurements" in path:
-        # Handle customer measurements endpoints
-        if path.endswith("/measurements"):
-            if http_method == "GET":
-                return get_customer_measurements(event, context)
-            elif http_method == "POST":
-                return save_customer_measurement(event, context)
-            elif http_method == "OPTIONS":
-                return handle_options(event, context)
-        elif "/measurements/" in path:
-            if http_method == "DELETE":
-                return delete_customer_measurement(event, context)
-            elif http_method == "OPTIONS":
-                return handle_options(event, context)
-    elif path.startswith("/customers/"):
-        if http_method == "GET":
-            return get_customer_by_id(event, context)
-        elif http_method == "PUT":
-            return update_customer(event, context)
-        elif http_method == "DELETE":
-            return delete_customer(event, context)
-        elif http_method == "OPTIONS":
-            return handle_options(event, context)
-
-    return {
-        "statusCode": 404,
-        "body": json.dumps({"error": "Not Found"}),
-        "headers": {
-            "Content-Type": "application/json",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "*",
-            "Access-Control-Allow-Headers": "*",
-        },
-    }
+    resource = event.get("resource") or event.get("path")
+    logger.info(
+        "Received %s %s (request %s)",
+        http_method,
+        event.get("path"),
+        event.get("requestContext", {}).get("requestId"),
+    )
+
+    handler = ROUTES.get((http_method, resource))
+    if handler:
+        return handler(event, context)
+
+    return create_response(404, {"error": "Not Found"})
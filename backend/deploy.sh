@@ -22,10 +22,24 @@ echo "🚀 Deploying backend to $ENVIRONMENT environment..."
 echo "🔨 Building SAM application..."
 sam build
 
+# Fill in the version index keys on existing app update rows before the new
+# check_for_updates (which only reads that index) goes live
+UPDATES_TABLE_NAME="MahaaTailors-AppUpdates-$ENVIRONMENT"
+backfill_app_updates() {
+  if aws dynamodb describe-table --table-name "$UPDATES_TABLE_NAME" --region ap-south-1 >/dev/null 2>&1; then
+    echo "🗂️  Backfilling app update version index..."
+    (cd app-updates && UPDATES_TABLE="$UPDATES_TABLE_NAME" AWS_DEFAULT_REGION=ap-south-1 python3 backfill_version_index.py)
+  fi
+}
+backfill_app_updates
+
 # Deploy using the specified environment configuration
 echo "📦 Deploying to AWS..."
 sam deploy --config-env $ENVIRONMENT
 
+# Catch rows the previous version registered while the deploy was rolling out
+backfill_app_updates
+
 # Get the API endpoint from the deployed stack
 BACKEND_STACK_NAME="MahaaTailors-Backend-$ENVIRONMENT"
 echo "📋 Getting deployment information..."
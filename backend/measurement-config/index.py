@@ -1,9 +1,12 @@
 import os
-import json
 import boto3
+import orjson
+from botocore.config import Config
 from botocore.exceptions import ClientError
+import hashlib
 import logging
 import time
+from decimal import Decimal
 
 # Configure logging
 logger = logging.getLogger()
@@ -15,79 +18,120 @@ MEASUREMENT_CONFIGS_TABLE_NAME = os.environ.get("MEASUREMENT_CONFIGS_TABLE_NAME"
 print(f"DEBUG: Using REGION: {REGION}")
 print(f"DEBUG: Using MEASUREMENT_CONFIGS_TABLE_NAME: {MEASUREMENT_CONFIGS_TABLE_NAME}")
 
-dynamodb = boto3.resource("dynamodb", region_name=REGION)
+# Keep connections to DynamoDB alive across warm invocations
+boto_config = Config(tcp_keepalive=True, retries={"max_attempts": 3, "mode": "adaptive"})
+
+dynamodb = boto3.resource("dynamodb", region_name=REGION, config=boto_config)
 measurement_configs_table = dynamodb.Table(MEASUREMENT_CONFIGS_TABLE_NAME)
 
-def handle_error(e, function_name):
-    logger.error(f"Error in {function_name}: {e}")
+# Configs change rarely, so a warm container serves GET /measurement-configs from
+# memory briefly. Writes clear only the container that handled them, so other
+# warm containers can serve (and 304) the old list until their copy expires;
+# the window is kept to a few seconds
+MEASUREMENT_CONFIGS_CACHE_TTL = 5
+_measurement_configs_cache = {}
+
+def _json_default(obj):
+    # DynamoDB hands numbers back as Decimal, which orjson does not encode natively
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+CORS_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "*",
+    "Access-Control-Allow-Headers": "*",
+    # Let browser clients read the validator they need for If-None-Match
+    "Access-Control-Expose-Headers": "ETag",
+}
+RESPONSE_HEADERS = {"Content-Type": "application/json", **CORS_HEADERS}
+# Browsers must revalidate cached lists with If-None-Match rather than reuse them
+LIST_CACHE_HEADERS = {"Cache-Control": "no-cache"}
+
+def _dumps(obj):
+    return orjson.dumps(obj, default=_json_default).decode()
+
+def create_response(status_code, body):
     return {
-        "statusCode": 500,
-        "body": json.dumps({"error": f"Error in {function_name}: {str(e)}"}),
-        "headers": {
-            "Content-Type": "application/json",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "*",
-            "Access-Control-Allow-Headers": "*",
-        },
+        "statusCode": status_code,
+        "body": _dumps(body),
+        "headers": RESPONSE_HEADERS,
     }
 
-def handle_options(event, context):
-    return {
-        "statusCode": 204,
-        "headers": {
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "*",
-            "Access-Control-Allow-Headers": "*",
-        },
-    }
+def _etag(body):
+    # Strong validator over the exact response bytes, so deletes change it too
+    return '"' + hashlib.blake2b(body.encode(), digest_size=8).hexdigest() + '"'
+
+def _if_none_match(event, etag):
+    # RFC 9110 weak comparison: any listed tag, W/ or not, or "*" counts as a match
+    headers = event.get("headers") or {}
+    header = headers.get("If-None-Match") or headers.get("if-none-match")
+    if not header:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
 
-def get_measurement_configs(event, context):
-    try:
-        response = measurement_configs_table.scan()
-        measurement_configs = [
+def handle_error(e, function_name):
+    logger.error("Error in %s: %s", function_name, e)
+    return create_response(500, {"error": f"Error in {function_name}: {str(e)}"})
+
+def _scan_measurement_configs():
+    scan_kwargs = {}
+    measurement_configs = []
+    # Follow LastEvaluatedKey so results past 1 MB are not cut short
+    while True:
+        response = measurement_configs_table.scan(**scan_kwargs)
+        measurement_configs.extend(
             {
                 "id": item["garment_type"],  # Use garment_type as id for frontend compatibility
                 "garmentType": item["garment_type"],
                 "measurements": item.get("measurements", []),
-                "createdAt": int(item["created_at"]) if item.get("created_at") else None,
-                "updatedAt": int(item["updated_at"]) if item.get("updated_at") else None,
+                "createdAt": item.get("created_at"),
+                "updatedAt": item.get("updated_at"),
             }
             for item in response.get("Items", [])
-        ]
+        )
+        if "LastEvaluatedKey" not in response:
+            break
+        scan_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+    return measurement_configs
 
-        logger.info(f"Fetched measurement configs: {measurement_configs}")
+def get_measurement_configs(event, context):
+    try:
+        now = time.time()
+        if _measurement_configs_cache.get("expires_at", 0) <= now:
+            measurement_configs = _scan_measurement_configs()
+            body = _dumps(measurement_configs)
+            _measurement_configs_cache.update(items=measurement_configs, body=body, etag=_etag(body), expires_at=now + MEASUREMENT_CONFIGS_CACHE_TTL)
+
+        logger.info("Fetched %d measurement configs", len(_measurement_configs_cache["items"]))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Fetched measurement configs: %s", _measurement_configs_cache["items"])
+        # Clients revalidating an unchanged list get a bodiless 304
+        etag = _measurement_configs_cache["etag"]
+        if _if_none_match(event, etag):
+            return {"statusCode": 304, "headers": {**CORS_HEADERS, **LIST_CACHE_HEADERS, "ETag": etag}}
         return {
             "statusCode": 200,
-            "body": json.dumps(measurement_configs),
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "*",
-                "Access-Control-Allow-Headers": "*",
-            },
+            "body": _measurement_configs_cache["body"],
+            "headers": {**RESPONSE_HEADERS, **LIST_CACHE_HEADERS, "ETag": etag},
         }
     except Exception as e:
         return handle_error(e, "get_measurement_configs")
 
 def add_measurement_config(event, context):
     try:
-        body = json.loads(event.get("body", "{}"))
-        logger.info(f"Add config request body: {body}")
+        body = orjson.loads(event.get("body") or "{}")
+        logger.debug("Add config request body: %s", body)
         garment_type = body.get("garmentType")
         measurements = body.get("measurements", body.get("fields", []))
-        logger.info(f"Parsed measurements for add: {measurements}")
+        logger.debug("Parsed measurements for add: %s", measurements)
 
         if not garment_type:
-            return {
-                "statusCode": 400,
-                "body": json.dumps({"error": "Garment type is required."}),
-                "headers": {
-                    "Content-Type": "application/json",
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "*",
-                    "Access-Control-Allow-Headers": "*",
-                },
-            }
+            return create_response(400, {"error": "Garment type is required."})
 
         now = int(time.time())
 
@@ -99,44 +143,27 @@ def add_measurement_config(event, context):
         }
 
         measurement_configs_table.put_item(Item=item)
+        _measurement_configs_cache.clear()
 
-        logger.info(f"Added measurement config: {item}")
-        return {
-            "statusCode": 200,
-            "body": json.dumps({
-                "id": garment_type,  # Include id for frontend compatibility
-                "garmentType": garment_type,
-                "measurements": measurements,
-            }),
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "*",
-                "Access-Control-Allow-Headers": "*",
-            },
-        }
+        logger.info("Added measurement config: %s", garment_type)
+        return create_response(200, {
+            "id": garment_type,  # Include id for frontend compatibility
+            "garmentType": garment_type,
+            "measurements": measurements,
+        })
     except Exception as e:
         return handle_error(e, "add_measurement_config")
 
 def update_measurement_config_by_id(event, context):
     try:
-        body = json.loads(event.get("body", "{}"))
-        logger.info(f"Update config by ID request body: {body}")
+        body = orjson.loads(event.get("body") or "{}")
+        logger.debug("Update config by ID request body: %s", body)
         garment_type = event["pathParameters"]["id"]
         measurements = body.get("measurements", body.get("fields", []))
-        logger.info(f"Parsed measurements for update by ID: {measurements}")
+        logger.debug("Parsed measurements for update by ID: %s", measurements)
 
         if not garment_type:
-            return {
-                "statusCode": 400,
-                "body": json.dumps({"error": "Garment type is required for update."}),
-                "headers": {
-                    "Content-Type": "application/json",
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "*",
-                    "Access-Control-Allow-Headers": "*",
-                },
-            }
+            return create_response(400, {"error": "Garment type is required for update."})
 
         now = int(time.time())
 
@@ -150,60 +177,36 @@ def update_measurement_config_by_id(event, context):
             Key={"garment_type": garment_type},
             UpdateExpression=update_expression,
             ExpressionAttributeValues=expression_attribute_values,
+            # Fail instead of upserting when the config does not exist
+            ConditionExpression="attribute_exists(garment_type)",
             ReturnValues="ALL_NEW",
         )
+        _measurement_configs_cache.clear()
 
         updated_item = response.get("Attributes")
-        logger.info(f"Updated measurement config: {updated_item}")
-        return {
-            "statusCode": 200,
-            "body": json.dumps({
-                "id": updated_item["garment_type"],  # Include id for frontend compatibility
-                "garmentType": updated_item["garment_type"],
-                "measurements": updated_item.get("measurements"),
-            }),
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "*",
-                "Access-Control-Allow-Headers": "*",
-            },
-        }
+        logger.info("Updated measurement config: %s", garment_type)
+        return create_response(200, {
+            "id": updated_item["garment_type"],  # Include id for frontend compatibility
+            "garmentType": updated_item["garment_type"],
+            "measurements": updated_item.get("measurements"),
+        })
     except ClientError as e:
-        if e.response["Error"]["Code"] == "ValidationException" and "The provided key element does not match the schema" in str(e):
-            return {
-                "statusCode": 404,
-                "body": json.dumps({"error": "Measurement config not found."}),
-                "headers": {
-                    "Content-Type": "application/json",
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "*",
-                    "Access-Control-Allow-Headers": "*",
-                },
-            }
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            return create_response(404, {"error": "Measurement config not found."})
         return handle_error(e, "update_measurement_config_by_id")
     except Exception as e:
         return handle_error(e, "update_measurement_config_by_id")
 
 def update_measurement_config(event, context):
     try:
-        body = json.loads(event.get("body", "{}"))
-        logger.info(f"Update config request body: {body}")
+        body = orjson.loads(event.get("body") or "{}")
+        logger.debug("Update config request body: %s", body)
         garment_type = body.get("garmentType")
         measurements = body.get("measurements", body.get("fields", []))
-        logger.info(f"Parsed measurements for update: {measurements}")
+        logger.debug("Parsed measurements for update: %s", measurements)
 
         if not garment_type:
-            return {
-                "statusCode": 400,
-                "body": json.dumps({"error": "Garment type is required for update."}),
-                "headers": {
-                    "Content-Type": "application/json",
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "*",
-                    "Access-Control-Allow-Headers": "*",
-                },
-            }
+            return create_response(400, {"error": "Garment type is required for update."})
 
         now = int(time.time())
 
@@ -217,37 +220,22 @@ def update_measurement_config(event, context):
             Key={"garment_type": garment_type},
             UpdateExpression=update_expression,
             ExpressionAttributeValues=expression_attribute_values,
+            # Fail instead of upserting when the config does not exist
+            ConditionExpression="attribute_exists(garment_type)",
             ReturnValues="ALL_NEW",
         )
+        _measurement_configs_cache.clear()
 
         updated_item = response.get("Attributes")
-        logger.info(f"Updated measurement config: {updated_item}")
-        return {
-            "statusCode": 200,
-            "body": json.dumps({
-                "id": updated_item["garment_type"],  # Include id for frontend compatibility
-                "garmentType": updated_item["garment_type"],
-                "measurements": updated_item.get("measurements"),
-            }),
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "*",
-                "Access-Control-Allow-Headers": "*",
-            },
-        }
+        logger.info("Updated measurement config: %s", garment_type)
+        return create_response(200, {
+            "id": updated_item["garment_type"],  # Include id for frontend compatibility
+            "garmentType": updated_item["garment_type"],
+            "measurements": updated_item.get("measurements"),
+        })
     except ClientError as e:
-        if e.response["Error"]["Code"] == "ValidationException" and "The provided key element does not match the schema" in str(e):
-            return {
-                "statusCode": 404,
-                "body": json.dumps({"error": "Measurement config not found."}),
-                "headers": {
-                    "Content-Type": "application/json",
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "*",
-                    "Access-Control-Allow-Headers": "*",
-                },
-            }
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            return create_response(404, {"error": "Measurement config not found."})
         return handle_error(e, "update_measurement_config")
     except Exception as e:
         return handle_error(e, "update_measurement_config")
@@ -256,62 +244,43 @@ def delete_measurement_config(event, context):
     try:
         garment_type = event["pathParameters"]["id"]
         if not garment_type:
-            return {
-                "statusCode": 400,
-                "body": json.dumps({"error": "Garment type is required for deletion."}),
-                "headers": {
-                    "Content-Type": "application/json",
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "*",
-                    "Access-Control-Allow-Headers": "*",
-                },
-            }
+            return create_response(400, {"error": "Garment type is required for deletion."})
 
-        measurement_configs_table.delete_item(Key={"garment_type": garment_type})
+        measurement_configs_table.delete_item(
+            Key={"garment_type": garment_type},
+            ConditionExpression="attribute_exists(garment_type)",
+        )
+        _measurement_configs_cache.clear()
 
-        logger.info(f"Deleted measurement config with Garment Type: {garment_type}")
-        return {
-            "statusCode": 200,
-            "body": json.dumps("Measurement config deleted successfully!"),
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "*",
-                "Access-Control-Allow-Headers": "*",
-            },
-        }
+        logger.info("Deleted measurement config with Garment Type: %s", garment_type)
+        return create_response(200, "Measurement config deleted successfully!")
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            return create_response(404, {"error": "Measurement config not found."})
+        return handle_error(e, "delete_measurement_config")
     except Exception as e:
         return handle_error(e, "delete_measurement_config")
 
+ROUTES = {
+    ("GET", "/measurement-configs"): get_measurement_configs,
+    ("POST", "/measurement-configs"): add_measurement_config,
+    ("PUT", "/measurement-configs"): update_measurement_config,
+    ("PUT", "/measurement-configs/{id}"): update_measurement_config_by_id,
+    ("DELETE", "/measurement-configs/{id}"): delete_measurement_config,
+}
+
 def lambda_handler(event, context):
-    logger.info(f"Received event: {json.dumps(event)}")
     http_method = event.get("httpMethod")
-    path = event.get("path")
-
-    if path == "/measurement-configs":
-        if http_method == "GET":
-            return get_measurement_configs(event, context)
-        elif http_method == "POST":
-            return add_measurement_config(event, context)
-        elif http_method == "PUT":
-            return update_measurement_config(event, context)
-        elif http_method == "OPTIONS":
-            return handle_options(event, context)
-    elif path.startswith("/measurement-configs/"):
-        if http_method == "PUT":
-            return update_measurement_config_by_id(event, context)
-        elif http_method == "DELETE":
-            return delete_measurement_config(event, context)
-        elif http_method == "OPTIONS":
-            return handle_options(event, context)
-
-    return {
-        "statusCode": 404,
-        "body": json.dumps({"error": "Not Found"}),
-        "headers": {
-            "Content-Type": "application/json",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "*",
-            "Access-Control-Allow-Headers": "*",
-        },
-    }
+    resource = event.get("resource") or event.get("path")
+    logger.info(
+        "Received %s %s (request %s)",
+        http_method,
+        event.get("path"),
+        event.get("requestContext", {}).get("requestId"),
+    )
+
+    handler = ROUTES.get((http_method, resource))
+    if handler:
+        return handler(event, context)
+
+    return create_response(404, {"error": "Not Found"})
@@ -1,8 +1,13 @@
 import os
-import json
 import boto3
+import orjson
+from botocore.config import Config
 from botocore.exceptions import ClientError
+import hashlib
 import logging
+import time
+import uuid
+from decimal import Decimal, InvalidOperation
 
 # Configure logging
 logger = logging.getLogger()
@@ -14,88 +19,138 @@ SERVICES_TABLE_NAME = os.environ.get("SERVICES_TABLE_NAME", "Services")
 print(f"DEBUG: Using REGION: {REGION}")
 print(f"DEBUG: Using SERVICES_TABLE_NAME: {SERVICES_TABLE_NAME}")
 
-dynamodb = boto3.resource("dynamodb", region_name=REGION)
+# Keep connections to DynamoDB alive across warm invocations
+boto_config = Config(tcp_keepalive=True, retries={"max_attempts": 3, "mode": "adaptive"})
+
+dynamodb = boto3.resource("dynamodb", region_name=REGION, config=boto_config)
 services_table = dynamodb.Table(SERVICES_TABLE_NAME)
 
-def handle_error(e, function_name):
-    logger.error(f"Error in {function_name}: {e}")
-    return {
-        "statusCode": 500,
-        "body": json.dumps({"error": f"Error in {function_name}: {str(e)}"}),
-        "headers": {
-            "Content-Type": "application/json",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "*",
-            "Access-Control-Allow-Headers": "*",
-        },
-    }
+# Only the attributes the list response uses; "name" is a reserved word
+SERVICE_PROJECTION = "service_id, #n, description, default_price"
+
+# The catalogue changes rarely, so a warm container serves GET /services from
+# memory briefly. Writes clear only the container that handled them, so other
+# warm containers can serve (and 304) the old list until their copy expires;
+# the window is kept to a few seconds
+SERVICES_CACHE_TTL = 5
+_services_cache = {}
+
+def _json_default(obj):
+    # DynamoDB hands numbers back as Decimal, which orjson does not encode natively
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
 
-def handle_options(event, context):
+def _dumps(obj):
+    return orjson.dumps(obj, default=_json_default).decode()
+
+# DynamoDB numbers must be Decimal; floats go through repr() so 12.5 stays 12.5
+# instead of picking up binary rounding noise, and ints skip the string parse.
+# Anything that is not a finite number raises ValueError for a 400 response
+def _to_decimal(value):
+    if isinstance(value, bool):
+        raise ValueError(f"Not a number: {value!r}")
+    try:
+        if isinstance(value, Decimal):
+            result = value
+        elif isinstance(value, float):
+            result = Decimal(repr(value))
+        else:
+            result = Decimal(value)
+    except (InvalidOperation, TypeError, ValueError):
+        raise ValueError(f"Not a number: {value!r}")
+    if not result.is_finite():
+        raise ValueError(f"Not a number: {value!r}")
+    return result
+
+CORS_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "*",
+    "Access-Control-Allow-Headers": "*",
+    # Let browser clients read the validator they need for If-None-Match
+    "Access-Control-Expose-Headers": "ETag",
+}
+RESPONSE_HEADERS = {"Content-Type": "application/json", **CORS_HEADERS}
+# Browsers must revalidate cached lists with If-None-Match rather than reuse them
+LIST_CACHE_HEADERS = {"Cache-Control": "no-cache"}
+
+def create_response(status_code, body):
     return {
-        "statusCode": 204,
-        "headers": {
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "*",
-            "Access-Control-Allow-Headers": "*",
-        },
+        "statusCode": status_code,
+        "body": _dumps(body),
+        "headers": RESPONSE_HEADERS,
     }
 
+def _etag(body):
+    # Strong validator over the exact response bytes, so deletes change it too
+    return '"' + hashlib.blake2b(body.encode(), digest_size=8).hexdigest() + '"'
+
+def _if_none_match(event, etag):
+    # RFC 9110 weak comparison: any listed tag, W/ or not, or "*" counts as a match
+    headers = event.get("headers") or {}
+    header = headers.get("If-None-Match") or headers.get("if-none-match")
+    if not header:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+def handle_error(e, function_name):
+    logger.error("Error in %s: %s", function_name, e)
+    return create_response(500, {"error": f"Error in {function_name}: {str(e)}"})
+
 def add_service(event, context):
     try:
-        body = json.loads(event.get("body", "{}"))
+        body = orjson.loads(event.get("body") or "{}")
         name = body.get("name")
         description = body.get("description")
         default_price = body.get("defaultPrice")
 
         if not name or default_price is None:
-            return {
-                "statusCode": 400,
-                "body": json.dumps({"error": "Service name and default price are required."}),
-                "headers": {
-                    "Content-Type": "application/json",
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "*",
-                    "Access-Control-Allow-Headers": "*",
-                },
-            }
+            return create_response(400, {"error": "Service name and default price are required."})
 
-        service_id = f"svc-{int(os.urandom(4).hex(), 16)}" # Simple unique ID
-        now = boto3.dynamodb.types.Decimal(str(int(os.urandom(4).hex(), 16)))
+        try:
+            default_price_decimal = _to_decimal(default_price)
+        except ValueError:
+            return create_response(400, {"error": "Default price must be a number."})
+
+        service_id = f"svc-{uuid.uuid4().hex}"
+        now = int(time.time())
 
         item = {
             "service_id": service_id,
             "name": name,
             "description": description,
-            "default_price": default_price,
+            "default_price": default_price_decimal,
             "created_at": now,
             "updated_at": now,
         }
 
         services_table.put_item(Item=item)
+        _services_cache.clear()
 
-        logger.info(f"Added service: {item}")
-        return {
-            "statusCode": 200,
-            "body": json.dumps({
-                "id": service_id,
-                "name": name,
-                "description": description,
-                "defaultPrice": default_price,
-            }),
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "*",
-                "Access-Control-Allow-Headers": "*",
-            },
-        }
+        logger.info("Added service: %s", service_id)
+        return create_response(200, {
+            "id": service_id,
+            "name": name,
+            "description": description,
+            "defaultPrice": default_price_decimal,
+        })
     except Exception as e:
         return handle_error(e, "add_service")
 
-def get_services(event, context):
-    try:
-        response = services_table.scan()
-        services = [
+def _scan_services():
+    scan_kwargs = {
+        "ProjectionExpression": SERVICE_PROJECTION,
+        "ExpressionAttributeNames": {"#n": "name"},
+    }
+    services = []
+    # Follow LastEvaluatedKey so a catalogue past 1 MB is not cut short
+    while True:
+        response = services_table.scan(**scan_kwargs)
+        services.extend(
             {
                 "id": item["service_id"],
                 "name": item["name"],
@@ -103,90 +158,84 @@ def get_services(event, context):
                 "defaultPrice": item["default_price"],
             }
             for item in response.get("Items", [])
-        ]
+        )
+        if "LastEvaluatedKey" not in response:
+            break
+        scan_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+    return services
+
+def get_services(event, context):
+    try:
+        now = time.time()
+        if _services_cache.get("expires_at", 0) <= now:
+            services = _scan_services()
+            body = _dumps(services)
+            _services_cache.update(items=services, body=body, etag=_etag(body), expires_at=now + SERVICES_CACHE_TTL)
 
-        logger.info(f"Fetched services: {services}")
+        logger.info("Fetched %d services", len(_services_cache["items"]))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Fetched services: %s", _services_cache["items"])
+        # Clients revalidating an unchanged list get a bodiless 304
+        etag = _services_cache["etag"]
+        if _if_none_match(event, etag):
+            return {"statusCode": 304, "headers": {**CORS_HEADERS, **LIST_CACHE_HEADERS, "ETag": etag}}
         return {
             "statusCode": 200,
-            "body": json.dumps(services),
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "*",
-                "Access-Control-Allow-Headers": "*",
-            },
+            "body": _services_cache["body"],
+            "headers": {**RESPONSE_HEADERS, **LIST_CACHE_HEADERS, "ETag": etag},
         }
     except Exception as e:
         return handle_error(e, "get_services")
 
 def update_service(event, context):
     try:
-        body = json.loads(event.get("body", "{}"))
+        body = orjson.loads(event.get("body") or "{}")
         service_id = event["pathParameters"]["id"]
         name = body.get("name")
         description = body.get("description")
         default_price = body.get("defaultPrice")
 
         if not service_id or not name or default_price is None:
-            return {
-                "statusCode": 400,
-                "body": json.dumps({"error": "Service ID, name, and default price are required for update."}),
-                "headers": {
-                    "Content-Type": "application/json",
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "*",
-                    "Access-Control-Allow-Headers": "*",
-                },
-            }
+            return create_response(400, {"error": "Service ID, name, and default price are required for update."})
+
+        try:
+            default_price_decimal = _to_decimal(default_price)
+        except ValueError:
+            return create_response(400, {"error": "Default price must be a number."})
 
-        now = boto3.dynamodb.types.Decimal(str(int(os.urandom(4).hex(), 16)))
+        now = int(time.time())
 
         update_expression = "SET #n = :name, description = :description, default_price = :defaultPrice, updated_at = :updatedAt"
         expression_attribute_names = {"#n": "name"}
         expression_attribute_values = {
             ":name": name,
             ":description": description,
-            ":defaultPrice": default_price,
+            ":defaultPrice": default_price_decimal,
             ":updatedAt": now,
         }
 
-        response = services_table.update_item(
+        # Everything the response needs is already in hand; don't ask DynamoDB to echo it back
+        services_table.update_item(
             Key={"service_id": service_id},
             UpdateExpression=update_expression,
             ExpressionAttributeNames=expression_attribute_names,
             ExpressionAttributeValues=expression_attribute_values,
-            ReturnValues="ALL_NEW",
+            # Fail instead of upserting when the service does not exist
+            ConditionExpression="attribute_exists(service_id)",
+            ReturnValues="NONE",
         )
+        _services_cache.clear()
 
-        updated_item = response.get("Attributes")
-        logger.info(f"Updated service: {updated_item}")
-        return {
-            "statusCode": 200,
-            "body": json.dumps({
-                "id": updated_item["service_id"],
-                "name": updated_item["name"],
-                "description": updated_item.get("description"),
-                "defaultPrice": updated_item["default_price"],
-            }),
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "*",
-                "Access-Control-Allow-Headers": "*",
-            },
-        }
+        logger.info("Updated service: %s", service_id)
+        return create_response(200, {
+            "id": service_id,
+            "name": name,
+            "description": description,
+            "defaultPrice": default_price_decimal,
+        })
     except ClientError as e:
-        if e.response["Error"]["Code"] == "ValidationException" and "The provided key element does not match the schema" in str(e):
-            return {
-                "statusCode": 404,
-                "body": json.dumps({"error": "Service not found."}),
-                "headers": {
-                    "Content-Type": "application/json",
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "*",
-                    "Access-Control-Allow-Headers": "*",
-                },
-            }
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            return create_response(404, {"error": "Service not found."})
         return handle_error(e, "update_service")
     except Exception as e:
         return handle_error(e, "update_service")
@@ -195,60 +244,42 @@ def delete_service(event, context):
     try:
         service_id = event["pathParameters"]["id"]
         if not service_id:
-            return {
-                "statusCode": 400,
-                "body": json.dumps({"error": "Service ID is required for deletion."}),
-                "headers": {
-                    "Content-Type": "application/json",
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "*",
-                    "Access-Control-Allow-Headers": "*",
-                },
-            }
+            return create_response(400, {"error": "Service ID is required for deletion."})
 
-        services_table.delete_item(Key={"service_id": service_id})
+        services_table.delete_item(
+            Key={"service_id": service_id},
+            ConditionExpression="attribute_exists(service_id)",
+        )
+        _services_cache.clear()
 
-        logger.info(f"Deleted service with ID: {service_id}")
-        return {
-            "statusCode": 200,
-            "body": json.dumps("Service deleted successfully!"),
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "*",
-                "Access-Control-Allow-Headers": "*",
-            },
-        }
+        logger.info("Deleted service with ID: %s", service_id)
+        return create_response(200, "Service deleted successfully!")
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            return create_response(404, {"error": "Service not found."})
+        return handle_error(e, "delete_service")
     except Exception as e:
         return handle_error(e, "delete_service")
 
+ROUTES = {
+    ("GET", "/services"): get_services,
+    ("POST", "/services"): add_service,
+    ("PUT", "/services/{id}"): update_service,
+    ("DELETE", "/services/{id}"): delete_service,
+}
+
 def lambda_handler(event, context):
-    logger.info(f"Received event: {json.dumps(event)}")
     http_method = event.get("httpMethod")
-    path = event.get("path")
-
-    if path == "/services":
-        if http_method == "GET":
-            return get_services(event, context)
-        elif http_method == "POST":
-            return add_service(event, context)
-        elif http_method == "OPTIONS":
-            return handle_options(event, context)
-    elif path.startswith("/services/"):
-        if http_method == "PUT":
-            return update_service(event, context)
-        elif http_method == "DELETE":
-            return delete_service(event, context)
-        elif http_method == "OPTIONS":
-            return handle_options(event, context)
+    resource = event.get("resource") or event.get("path")
+    logger.info(
+        "Received %s %s (request %s)",
+        http_method,
+        event.get("path"),
+        event.get("requestContext", {}).get("requestId"),
+    )
 
-    return {
-        "statusCode": 404,
-        "body": json.dumps({"error": "Not Found"}),
-        "headers": {
-            "Content-Type": "application/json",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "*",
-            "Access-Control-Allow-Headers": "*",
-        },
-    }
\ No newline at end of file
+    handler = ROUTES.get((http_method, resource))
+    if handler:
+        return handler(event, context)
+
+    return create_response(404, {"error": "Not Found"})